@@ -0,0 +1,34 @@
+"""Fills the EARS attendance workbooks from the MGB and BMC schedule exports.
+
+Importing the package (or any of its modules) opens no workbook and starts no
+Excel: workbooks are opened by an explicit run, either from the command line
+
+    python -m pkg_sync --site MGB
+
+or from Python with run_sync("MGB", ["block", "clinic"]). The names below are
+imported from their modules the first time they are used, so `import pkg_sync`
+itself stays cheap.
+"""
+
+_EXPORTS = {
+    "run_sync": "sync_pipeline",
+    "resume_sync": "sync_pipeline",
+    "main": "sync_pipeline",
+    "SITES": "sync_pipeline",
+    "EarsSession": "sync_pipeline",
+    "EarsRouter": "sync_pipeline",
+    "get_backend": "ears_backend",
+    "AttendanceFact": "ears_sources",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,6 @@
+"""python -m pkg_sync: run the sync from the command line (see sync_pipeline.main)"""
+
+from .sync_pipeline import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Throughput benchmark of the sync pipeline on synthetic workbooks.
+
+Generates the workbooks of both sites with synthetic_workbooks (no real names), then
+for every backend and site runs the pipeline stage by stage and once end to end:
+
+    read     open each source and read its data sheet      rows/sec (source rows)
+    parse    turn the tables into attendance facts         rows/sec (source rows)
+    open     open the EARS workbook, build date/name index
+    plan     queue every fact in the write plan            rows/sec (facts)
+    flush    write the changed cells                       cells written/sec
+    save     save the EARS workbook
+    sync     run_sync on a fresh copy, end to end           rows/sec (source rows)
+
+Every site runs in its own process, so the peak RSS column is the high water mark of
+that process once the stage is done (the sync line gets a process of its own).
+Usage:
+
+    python -m pkg_sync.benchmark_sync --trainees 175 --json results.json
+    python -m pkg_sync.benchmark_sync --compare results.json    # exit 1 when a stage got slower
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .ears_backend import get_backend
+from .source_reader import read_sheet_table
+from .sync_pipeline import SITES, EarsRouter, EarsSession, run_sync
+from .synthetic_workbooks import make_all
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Return the peak resident memory of this process in MB (None where the resource module is missing)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # bytes on macOS, KB on Linux
+
+
+def stage(results, name, start, rows=None, cells=None):
+    """Record a finished stage that started at time start"""
+    results.append({"stage": name, "seconds": time.perf_counter() - start, "rows": rows, "cells": cells,
+                    "peak_rss_mb": peak_rss_mb()})
+
+
+def copy_folder(folder):
+    """Copy the generated workbooks into a fresh temp folder (runs write into the EARS workbook and leave
+    cache/state files behind, every run starts from the same files)"""
+    copy = tempfile.mkdtemp(prefix="pkg_sync_bench_")
+    for file_name in os.listdir(folder):
+        if not file_name.startswith("."):
+            shutil.copy(os.path.join(folder, file_name), copy)
+    return copy
+
+
+def bench_stages(folder, site, backend_name):
+    """Run the pipeline of a site one stage at a time and return the stage results"""
+    folder = copy_folder(folder)
+    site_config = SITES[site]
+    backend = get_backend(backend_name)
+    results = []
+
+    start = time.perf_counter()
+    tables = {}
+    for source, (file_name, sheet_name, parser) in site_config["sources"].items():
+        source_wb = backend.open_source(os.path.join(folder, file_name))
+        tables[source] = read_sheet_table(source_wb.sheet(sheet_name))
+        source_wb.close()
+    source_rows = sum(len(table.rows) for table in tables.values())
+    stage(results, "read", start, rows=source_rows)
+
+    start = time.perf_counter()
+    facts = []
+    for source, (_, _, parser) in site_config["sources"].items():
+        facts += parser(tables[source], [])
+    stage(results, "parse", start, rows=source_rows)
+
+    start = time.perf_counter()
+    session = EarsSession(backend, os.path.join(folder, site_config["ears"]), use_name_cache=False)
+    router = EarsRouter([session])
+    router.prepare()  # the session only opens the workbook and builds its indexes on first use
+    stage(results, "open", start)
+
+    start = time.perf_counter()
+    router.apply(facts)
+    stage(results, "plan", start, rows=len(facts))
+
+    start = time.perf_counter()
+    session.plan.flush()
+    stage(results, "flush", start, cells=session.plan.cells_written)
+
+    start = time.perf_counter()
+    session.workbook.save()
+    stage(results, "save", start)
+    shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+def bench_sync(folder, site, backend_name, workers):
+    """Run run_sync end to end on a fresh copy of the workbooks and return its result"""
+    folder = copy_folder(folder)
+    site_config = SITES[site]
+    source_rows = 0
+    backend = get_backend(backend_name)
+    for file_name, sheet_name, _ in site_config["sources"].values():
+        source_wb = backend.open_source(os.path.join(folder, file_name))
+        source_rows += len(source_wb.sheet(sheet_name).used_values())
+        source_wb.close()
+    paths = {source: os.path.join(folder, file_name) for source, (file_name, _, _) in site_config["sources"].items()}
+
+    results = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_sync(site, list(site_config["sources"]), backend_name=backend_name,
+                 ears_path=os.path.join(folder, site_config["ears"]), source_paths=paths, workers=workers)
+    stage(results, "sync", start, rows=source_rows)
+    shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+def in_child(function, *args):
+    """Run function(*args) in a fresh process (so its peak RSS is its own) and return the result"""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(function, *args).result()
+
+
+def run_benchmarks(folder, backends, sites, workers=1):
+    """Return {"backend/site": [stage results]} for every backend and site"""
+    report = {}
+    for backend_name in backends:
+        for site in sites:
+            key = f"{backend_name}/{site}"
+            report[key] = in_child(bench_stages, folder, site, backend_name)
+            report[key] += in_child(bench_sync, folder, site, backend_name, workers)
+    return report
+
+
+def throughput(result):
+    """Return (rows/sec, cells written/sec) of a stage result, None where the stage doesn't count them"""
+    seconds = max(result["seconds"], 1e-9)
+    rows = result["rows"] / seconds if result["rows"] is not None else None
+    cells = result["cells"] / seconds if result["cells"] is not None else None
+    return rows, cells
+
+
+def format_report(report):
+    """Return the benchmark results as a printable table"""
+    def number(value, width, fmt):
+        return f"{value:{width}{fmt}}" if value is not None else f"{'-':>{width}}"
+
+    lines = [f"{'case':<16} {'stage':<6} {'seconds':>9} {'rows/s':>11} {'cells/s':>11} {'peak MB':>8}"]
+    for key, results in report.items():
+        for result in results:
+            rows, cells = throughput(result)
+            lines.append(f"{key:<16} {result['stage']:<6} {result['seconds']:9.3f} {number(rows, 11, ',.0f')} "
+                         f"{number(cells, 11, ',.0f')} {number(result['peak_rss_mb'], 8, '.1f')}")
+    return "\n".join(lines)
+
+
+def compare(report, baseline, tolerance, min_seconds=0.1):
+    """Given two reports, return a line for every stage that got more than tolerance (ex: 0.25 = 25%) slower.
+    Stages that took under min_seconds in the baseline are too noisy to compare and are skipped"""
+    regressions = []
+    for key, results in report.items():
+        old_results = {result["stage"]: result for result in baseline.get(key, [])}
+        for result in results:
+            old = old_results.get(result["stage"])
+            if old and old["seconds"] >= min_seconds and result["seconds"] > old["seconds"] * (1 + tolerance):
+                regressions.append(f"{key} {result['stage']}: {old['seconds']:.3f}s -> {result['seconds']:.3f}s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the sync pipeline on synthetic workbooks.")
+    parser.add_argument("--trainees", type=int, default=150)
+    parser.add_argument("--backends", default="openpyxl", help="comma separated (xlwings needs Excel)")
+    parser.add_argument("--sites", default=",".join(SITES))
+    parser.add_argument("--workers", type=int, default=1, help="parsing processes of the end to end sync")
+    parser.add_argument("--folder", help="keep the generated workbooks here (default: a temp folder)")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown per stage (default 25%%)")
+    args = parser.parse_args(argv)
+
+    folder = args.folder or tempfile.mkdtemp(prefix="pkg_sync_workbooks_")
+    make_all(folder, args.trainees)
+    report = run_benchmarks(folder, args.backends.split(","), args.sites.split(","), args.workers)
+    if not args.folder:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as results_file:
+            json.dump(report, results_file, indent=1)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.tolerance)
+        for line in regressions:
+            print("Slower:", line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Workbook backends.
+
+Everything that touches a workbook goes through the small interface below, so the
+same sync can run against a live Excel instance (xlwings) or straight against the
+files on disk (openpyxl, no Excel needed, works on Linux).
+
+A backend opens workbooks:
+    backend.open_ears(path)    -> workbook the attendance marks get written into
+    backend.open_source(path)  -> read only schedule workbook
+
+A workbook has .path, .sheets (list), .sheet(name), .unsaved_changes() (True if
+the copy open in Excel differs from the file), .save() and .close().
+A sheet has .name, .read(top, left, bottom, right) which returns a 2D list,
+.write(top, left, values) for a 2D list of values, .used_values() which
+returns every row from A1 to the last used cell, and .iter_chunks(chunk_rows)
+which yields the same rows in lists of chunk_rows rows.
+"""
+
+import os
+
+
+def get_backend(name="xlwings"):
+    """Given the name of a backend ("xlwings" or "openpyxl"), return the backend object"""
+    if name == "xlwings":
+        return XlwingsBackend()
+    if name == "openpyxl":
+        return OpenpyxlBackend()
+    raise ValueError(f"unknown workbook backend: {name}")
+
+
+def default_backend_name():
+    """Return the backend named by the PKG_SYNC_BACKEND environment variable (xlwings if unset)"""
+    return os.environ.get("PKG_SYNC_BACKEND", "xlwings")
+
+
+# ***************************************************************
+# xlwings: drives a running copy of Excel
+# ***************************************************************
+
+class XlwingsBackend:
+    name = "xlwings"
+
+    def __init__(self):
+        import xlwings  # must install pip, and install xlwings using pip
+        self.xw = xlwings
+
+    def open_ears(self, path):
+        return XlwingsWorkbook(self.xw.Book(path), path)
+
+    def open_source(self, path):
+        return XlwingsWorkbook(self.xw.Book(path), path)
+
+
+class XlwingsWorkbook:
+    def __init__(self, book, path):
+        self.book = book
+        self.path = path
+
+    @property
+    def sheets(self):
+        return [XlwingsSheet(sheet) for sheet in self.book.sheets]
+
+    def sheet(self, name):
+        return XlwingsSheet(self.book.sheets[name])
+
+    def unsaved_changes(self):
+        """Return True if the book open in Excel holds changes not saved to its file (xw.Book attaches to the
+        copy already open). Assumed True when Excel doesn't say (the Saved flag is only on Windows)"""
+        try:
+            return not self.book.api.Saved
+        except Exception:
+            return True
+
+    def save(self):
+        self.book.save(self.path)
+
+    def close(self):
+        pass  # leave the book open in Excel, the user may still be looking at it
+
+
+class XlwingsSheet:
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.name = sheet.name
+
+    def read(self, top, left, bottom, right):
+        return self.sheet.range((top, left), (bottom, right)).options(ndim=2).value
+
+    def write(self, top, left, values):
+        self.sheet.range((top, left)).value = values
+
+    def used_values(self):
+        last_cell = self.sheet.used_range.last_cell
+        return self.read(1, 1, last_cell.row, last_cell.column)
+
+    def iter_chunks(self, chunk_rows):
+        last_cell = self.sheet.used_range.last_cell
+        for top in range(1, last_cell.row + 1, chunk_rows):
+            yield self.read(top, 1, min(top + chunk_rows - 1, last_cell.row), last_cell.column)
+
+    def __repr__(self):
+        return f"<Sheet {self.name}>"
+
+
+# ***************************************************************
+# openpyxl: works on the files directly, no Excel needed
+# ***************************************************************
+
+class OpenpyxlBackend:
+    name = "openpyxl"
+
+    def __init__(self):
+        import openpyxl  # pip install openpyxl
+        self.openpyxl = openpyxl
+
+    def open_ears(self, path):
+        # keep_vba=True is necessary to prevent macros from being stripped when the workbook is saved
+        book = self.openpyxl.load_workbook(path, keep_vba=path.lower().endswith(".xlsm"))
+        return OpenpyxlWorkbook(book, path, self)
+
+    def open_source(self, path):
+        # read_only streams the sheet instead of building every cell object,
+        # data_only=True is needed because cells may contain formulas, we want the value displayed
+        book = self.openpyxl.load_workbook(path, read_only=True, data_only=True)
+        return OpenpyxlWorkbook(book, path, self)
+
+
+class OpenpyxlWorkbook:
+    def __init__(self, book, path, backend):
+        self.book = book
+        self.path = path
+        self.backend = backend
+        self._cached_values = None  # data_only copy of the workbook, loaded the first time a formula is read
+
+    @property
+    def sheets(self):
+        return [OpenpyxlSheet(sheet, self) for sheet in self.book.worksheets]
+
+    def sheet(self, name):
+        if isinstance(name, int):
+            return OpenpyxlSheet(self.book.worksheets[name], self)
+        return OpenpyxlSheet(self.book[name], self)
+
+    def cached_values(self, sheet_name):
+        """Return the data_only version of a sheet, which holds the values Excel last calculated for formulas"""
+        if self._cached_values is None:
+            self._cached_values = self.backend.openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+        return self._cached_values[sheet_name]
+
+    def unsaved_changes(self):
+        return False  # read from the file
+
+    def save(self):
+        self.book.save(self.path)
+
+    def close(self):
+        if getattr(self.book, "read_only", False):
+            self.book.close()
+        if self._cached_values is not None:
+            self._cached_values.close()
+            self._cached_values = None
+
+
+class OpenpyxlSheet:
+    def __init__(self, sheet, workbook):
+        self.sheet = sheet
+        self.workbook = workbook
+        self.name = sheet.title
+
+    def read(self, top, left, bottom, right):
+        rows = [list(row) for row in self.sheet.iter_rows(min_row=top, max_row=bottom, min_col=left,
+                                                           max_col=right, values_only=True)]
+        width = right - left + 1
+        rows += [[] for _ in range(bottom - top + 1 - len(rows))]
+        rows = [row + [None] * (width - len(row)) for row in rows]
+        # formulas come back as their text ("=EOMONTH(...)"), look up the value Excel calculated instead
+        for i, row in enumerate(rows):
+            for j, value in enumerate(row):
+                if isinstance(value, str) and value.startswith("="):
+                    cached = self.workbook.cached_values(self.name)
+                    rows[i][j] = cached.cell(top + i, left + j).value
+        return rows
+
+    def write(self, top, left, values):
+        for i, row in enumerate(values):
+            for j, value in enumerate(row):
+                self.sheet.cell(top + i, left + j).value = value
+
+    def used_values(self):
+        return [list(row) for row in self.sheet.iter_rows(min_row=1, min_col=1, values_only=True)]
+
+    def iter_chunks(self, chunk_rows):
+        # source workbooks are opened read_only, so iter_rows streams the sheet XML instead of loading it
+        chunk = []
+        for row in self.sheet.iter_rows(min_row=1, min_col=1, values_only=True):
+            chunk.append(list(row))
+            if len(chunk) == chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def __repr__(self):
+        return f"<Sheet {self.name}>"
@@ -0,0 +1,151 @@
+"""Date -> EARS month sheet index.
+
+Looking up the month sheet of a date used to walk every worksheet and read C9, C8
+and G4 through separate calls, for every date of every trainee. The EarsCalendar
+reads the header of each month sheet once and keeps a {date: sheet} dictionary,
+so every lookup afterwards is a single dictionary access.
+"""
+
+import bisect
+import calendar
+from datetime import date, datetime, timedelta
+
+MONTH_NUM = {"January": 1, "February": 2, "March": 3, "April": 4, "May": 5, "June": 6, "July": 7, "August": 8, "September": 9, "October": 10, "November": 11, "December": 12}
+IRRELEVANT_SHEETS = ["HPT_List", "D", "CODES", "FINAL RECONCILIATION", "EAR_OVERVIEW"]
+
+
+def as_date(value):
+    """Given a date or datetime object, return the plain date (the time of day is dropped)"""
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def read_sheet_span(sheet):
+    """Given an EARS month sheet, return the (first date, last date) it covers, or None if
+    the sheet has no month header. C8 holds the month name, C9 the year and G4 the last date;
+    all three are read with a single range call"""
+    header = sheet.read(4, 3, 9, 7)  # C4:G9, 6 rows x 5 cols, C4 is header[0][0]
+    month_name, year, end = header[4][0], header[5][0], header[0][4]
+    if month_name not in MONTH_NUM or year is None:
+        return None
+    start = date(int(year), MONTH_NUM[month_name], 1)
+    if isinstance(end, (date, datetime)):
+        end = as_date(end)
+    else:  # no end date on the sheet, assume the sheet covers the whole month
+        end = date(start.year, start.month, calendar.monthrange(start.year, start.month)[1])
+    return (start, end)
+
+
+class EarsCalendar:
+    """Maps every date covered by an EARS workbook to the month sheet holding it"""
+
+    def __init__(self, workbook, irrelevant_sheets=IRRELEVANT_SHEETS):
+        """Given the EARS workbook, read the header of every month sheet and build the index"""
+        self.workbook = workbook
+        self.irrelevant_sheets = irrelevant_sheets
+        self.build()
+
+    def build(self):
+        """(Re)build the {date: sheet} index from the current sheets of the workbook"""
+        self.signature = sheet_signature(self.workbook)
+        self.spans = []  # list of (first date, last date, sheet) in workbook order
+        self.dates = {}
+        for sheet in self.workbook.sheets:
+            if sheet.name in self.irrelevant_sheets:
+                continue
+            span = read_sheet_span(sheet)
+            if span is None:
+                continue
+            self.spans.append((span[0], span[1], sheet))
+            current_date = span[0]
+            while current_date <= span[1]:
+                self.dates.setdefault(current_date, sheet)  # first sheet wins, same as the old sheet walk
+                current_date += timedelta(days=1)
+        self.runs = DateRuns(self.dates)
+
+    def sheet_for(self, day):
+        """Given a date (or datetime), return the month sheet covering it, or None
+        if no sheet in the workbook covers that date"""
+        return self.dates.get(as_date(day))
+
+    def covers(self, day):
+        """Return True if some month sheet covers the given date"""
+        return as_date(day) in self.dates
+
+    def segments(self, start, end):
+        """Given a date interval (inclusive), return a list of (sheet, first date, last date) for
+        every part of the interval a month sheet covers. Dates no sheet covers are left out"""
+        return self.runs.segments(start, end)
+
+
+class CombinedCalendar:
+    """Maps every date covered by several EARS workbooks (ex: AY24 and AY25) to its (owner, month sheet).
+    Built from the EarsCalendar of each workbook, when two workbooks cover a date the first one wins"""
+
+    def __init__(self, calendars):
+        """Given a list of (owner, EarsCalendar), where owner is whatever the caller uses to find the workbook
+        again (ex: its session), build the combined index"""
+        self.dates = {}
+        for owner, calendar_ in calendars:
+            for day, sheet in calendar_.dates.items():
+                self.dates.setdefault(day, (owner, sheet))
+        self.runs = DateRuns(self.dates)
+
+    def covers(self, day):
+        return as_date(day) in self.dates
+
+    def segments(self, start, end):
+        """Given a date interval (inclusive), return a list of (owner, sheet, first date, last date) for
+        every part of the interval a month sheet of one of the workbooks covers"""
+        return [(owner, sheet, first, last) for (owner, sheet), first, last in self.runs.segments(start, end)]
+
+
+class DateRuns:
+    """Runs of consecutive dates mapped to the same value, to split date intervals quickly"""
+
+    def __init__(self, dates):
+        """Given {date: value}, build the runs (sorted by date) of consecutive dates with the same value"""
+        self._runs = []
+        for day in sorted(dates):
+            value = dates[day]
+            if self._runs and self._runs[-1][2] == value and self._runs[-1][1] == day - timedelta(days=1):
+                self._runs[-1][1] = day
+            else:
+                self._runs.append([day, day, value])
+        self._run_starts = [run[0] for run in self._runs]
+
+    def segments(self, start, end):
+        """Given a date interval (inclusive), return a list of (value, first date, last date) for every
+        part of the interval covered by a run. Dates in no run are left out"""
+        start, end = as_date(start), as_date(end)
+        segments = []
+        if start > end:
+            return segments
+        i = max(bisect.bisect_right(self._run_starts, start) - 1, 0)
+        while i < len(self._runs) and self._runs[i][0] <= end:
+            run_start, run_end, value = self._runs[i]
+            if run_end >= start:
+                segments.append((value, max(run_start, start), min(run_end, end)))
+            i += 1
+        return segments
+
+
+def sheet_signature(workbook):
+    """Given a workbook, return a tuple of its sheet names, used to notice added/removed/renamed sheets"""
+    return tuple(sheet.name for sheet in workbook.sheets)
+
+
+_calendars = {}  # workbook key -> EarsCalendar
+
+
+def calendar_for(workbook, irrelevant_sheets=IRRELEVANT_SHEETS):
+    """Given an EARS workbook, return its cached EarsCalendar. The calendar is rebuilt when the list
+    of sheets in the workbook changed since it was built, or when the file was opened again (the
+    calendar holds the sheet objects of the workbook it was built from)"""
+    key = workbook.path
+    cached = _calendars.get(key)
+    if cached is None or cached.workbook is not workbook or cached.signature != sheet_signature(workbook):
+        cached = EarsCalendar(workbook, irrelevant_sheets)
+        _calendars[key] = cached
+    return cached
@@ -0,0 +1,141 @@
+"""In-memory attendance grid of an EARS month sheet.
+
+The data region of a month sheet is I13:AM361: two rows (AM, PM) per trainee
+starting at row 13 and one column per day starting at column I. The grid keeps that
+region as a NumPy array of small integer codes with axes (trainee, day, shift), so
+sources are merged with array operations and only the cells that differ from what
+the sheet already holds get written.
+
+Codes grow with precedence, so when several sources mark the same half day the
+merged mark is a maximum. Which value wins (PTO over P by default) can be changed,
+and every half day two sources mark with different values is kept as a conflict.
+"""
+
+import numpy as np
+
+from .ears_names import FIRST_NAME_ROW, LAST_NAME_ROW
+
+FIRST_DAY_COL = 9  # day 1 of the month is column I
+DAYS = 31  # columns I:AM
+SHIFTS = ("AM", "PM")
+
+# Codes are ordered by precedence: when two sources mark the same half day the larger code wins
+NO_MARK = 0  # the grid has nothing to say about the cell, leave it alone
+CLEAR = 1  # the cell should be blank
+OTHER = -1  # a value on the sheet the grid has no code for (left alone unless the grid marks the cell)
+DEFAULT_PRECEDENCE = ("PTO", "P")  # the values the sync writes, highest precedence first
+
+
+def code_table(precedence=DEFAULT_PRECEDENCE):
+    """Given the values the sync writes, highest precedence first, return (code -> value list, value -> code dict)"""
+    code_values = [None, None] + list(reversed(precedence))
+    return code_values, {value: code for code, value in enumerate(code_values) if code > CLEAR}
+
+
+CODE_VALUES, CODE_IDS = code_table()
+
+
+def code_id(value, code_ids=CODE_IDS):
+    """Given a value written by the sync ("P", "PTO" or None for a blank), return its grid code"""
+    if value is None:
+        return CLEAR
+    return code_ids[value]
+
+
+def encode_values(values, code_ids=CODE_IDS):
+    """Given a 2D list of cell values, return an array of the same shape holding their codes
+    (CLEAR for blanks, OTHER for values the grid has no code for)"""
+    encoded = np.full((len(values), len(values[0]) if values else 0), OTHER, dtype=np.int8)
+    for i, row in enumerate(values):
+        for j, value in enumerate(row):
+            if value is None or value == "":
+                encoded[i, j] = CLEAR
+            elif value in code_ids:
+                encoded[i, j] = code_ids[value]
+    return encoded
+
+
+class AttendanceGrid:
+    """Attendance codes of one month sheet, shape (trainees, 31 days, 2 shifts), and the source each code came from"""
+
+    def __init__(self, precedence=DEFAULT_PRECEDENCE):
+        n_trainees = (LAST_NAME_ROW - FIRST_NAME_ROW + 1) // 2 + 1
+        self.codes = np.zeros((n_trainees, DAYS, len(SHIFTS)), dtype=np.int8)
+        self.owners = np.full(self.codes.shape, -1, dtype=np.int8)  # index in self.sources of the source of each code
+        self.flushed = np.zeros_like(self.codes)  # the codes as of the last flush of the grid (see WritePlan.flush)
+        self.sources = []
+        self.code_values, self.code_ids = code_table(precedence)
+
+    def source_id(self, source):
+        if source not in self.sources:
+            self.sources.append(source)
+        return self.sources.index(source)
+
+    @staticmethod
+    def position(row, col):
+        """Given a worksheet (row, col) in the data region, return the (trainee, day, shift) index"""
+        if row < FIRST_NAME_ROW or row > LAST_NAME_ROW + 1 or col < FIRST_DAY_COL or col >= FIRST_DAY_COL + DAYS:
+            raise ValueError(f"cell ({row}, {col}) is outside the attendance region of the sheet")
+        return ((row - FIRST_NAME_ROW) // 2, col - FIRST_DAY_COL, (row - FIRST_NAME_ROW) % 2)
+
+    def set_run(self, row, first_col, last_col, value, source=None):
+        """Mark every column from first_col to last_col (inclusive) of a worksheet row with value, on behalf of
+        source. Return a list of (col, kept value, kept source, dropped value, dropped source) for every column
+        already marked with another value (the higher precedence one is kept)"""
+        trainee, first_day, shift = self.position(row, first_col)
+        last_day = self.position(row, last_col)[1]
+        code = code_id(value, self.code_ids)
+        block = self.codes[trainee, first_day:last_day + 1, shift]
+        owners = self.owners[trainee, first_day:last_day + 1, shift]
+        conflicts = []
+        if code > CLEAR:
+            for day in np.nonzero((block > CLEAR) & (block != code))[0]:
+                old_value, old_source = self.code_values[block[day]], self.sources[owners[day]]
+                if block[day] > code:
+                    conflicts.append((first_col + int(day), old_value, old_source, value, source))
+                else:
+                    conflicts.append((first_col + int(day), value, source, old_value, old_source))
+        wins = block < code
+        block[wins] = code
+        owners[wins] = self.source_id(source)
+        return conflicts
+
+    def unflushed(self):
+        """Return the number of half days whose mark is new or changed since the last flush"""
+        return int(np.count_nonzero(self.codes != self.flushed))
+
+    def set_flushed(self):
+        self.flushed[...] = self.codes
+
+    def as_sheet_rows(self):
+        """Return the codes laid out like the sheet: one row per worksheet row (AM, PM, AM, ...), one column per day"""
+        return self.codes.transpose(0, 2, 1).reshape(-1, DAYS)
+
+    def changes(self, current_values):
+        """Given the current values of the data region (a 2D list starting at I13, as read from the sheet),
+        return {(row, col): value} for every cell the grid marks, since its last flush, with a value different
+        from the sheet's. A clear only blanks cells holding a value the sync writes itself (P/PTO), never other codes"""
+        desired = self.as_sheet_rows()[:len(current_values)]
+        unflushed = (self.codes != self.flushed).transpose(0, 2, 1).reshape(-1, DAYS)[:len(current_values)]
+        current = encode_values(current_values, self.code_ids)[:, :DAYS]
+        changed = unflushed & (desired != NO_MARK) & (desired != current) & ~((desired == CLEAR) & (current == OTHER))
+        rows, cols = np.nonzero(changed)
+        return {(FIRST_NAME_ROW + int(r), FIRST_DAY_COL + int(c)): self.code_values[desired[r, c]] for r, c in zip(rows, cols)}
+
+    def diff(self, current_values):
+        """Given the current values of the data region (as for changes), return {(row, col): (kind, expected value,
+        sheet value)} for every cell the sheet doesn't hold as the grid expects. kind is "missing" (the grid
+        marks the cell, the sheet is blank), "conflicting" (the sheet holds another value) or "extra" (the sheet
+        holds a value the sync writes, the grid has no mark for the cell)"""
+        expected = self.as_sheet_rows()[:len(current_values)]
+        current = encode_values(current_values, self.code_ids)[:, :DAYS]
+        marked = expected > CLEAR
+        kinds = {"missing": marked & (current == CLEAR),
+                 "conflicting": marked & (current != CLEAR) & (current != expected),
+                 "extra": (expected == NO_MARK) & (current > CLEAR)}
+        differences = {}
+        for kind, mask in kinds.items():
+            for r, c in zip(*np.nonzero(mask)):
+                differences[(FIRST_NAME_ROW + int(r), FIRST_DAY_COL + int(c))] = (
+                    kind, self.code_values[expected[r, c]], current_values[r][c])
+        return differences
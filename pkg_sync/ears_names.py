@@ -0,0 +1,103 @@
+"""Trainee name -> row index of the EARS month sheets.
+
+Every month sheet gets its own index (rows can shift when a trainee is added in the
+middle of the year), built from one bulk read of column B. The indexes are kept in a
+small JSON file next to the EARS workbook, keyed by workbook path, modification time
+and sheet name, so a run against an unchanged workbook skips the scan entirely.
+
+The cache describes the file on disk. A workbook open in Excel with changes not saved
+yet (ex: a trainee inserted, which moves every row under it) is always scanned, and
+after the sync saves a workbook only the indexes it scanned itself are kept for the
+next run.
+"""
+
+import json
+import os
+
+FIRST_NAME_ROW = 13  # names start at B13, two rows (AM, PM) per trainee
+LAST_NAME_ROW = 361
+CACHE_FILE_NAME = ".ears_names_cache.json"
+
+
+def read_name_rows(sheet):
+    """Given an EARS month sheet, read B13:B361 in one call and return a dictionary of name : AM row number"""
+    names_column = [row[0] for row in sheet.read(FIRST_NAME_ROW, 2, LAST_NAME_ROW, 2)]
+    names_dict = {}
+    for offset in range(0, len(names_column), 2):  # two rows for each name
+        name = names_column[offset]
+        if name != None:
+            names_dict.setdefault(name, FIRST_NAME_ROW + offset)
+    return names_dict
+
+
+class NameIndexCache:
+    """On disk cache of the name indexes: {workbook path: {"mtime": ..., "sheets": {sheet: {name: row}}}}"""
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.entries = {}
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path) as cache_file:
+                    self.entries = json.load(cache_file)
+            except (OSError, ValueError):
+                self.entries = {}  # unreadable cache, it gets rebuilt
+
+    def get(self, path, mtime, sheet_name):
+        """Return the cached index of a sheet, or None if the workbook changed since it was cached"""
+        entry = self.entries.get(path)
+        if entry is None or entry["mtime"] != mtime:
+            return None
+        return entry["sheets"].get(sheet_name)
+
+    def put(self, path, mtime, sheet_name, names_dict):
+        entry = self.entries.get(path)
+        if entry is None or entry["mtime"] != mtime:
+            entry = self.entries[path] = {"mtime": mtime, "sheets": {}}
+        entry["sheets"][sheet_name] = names_dict
+
+    def replace(self, path, mtime, sheets):
+        """Given {sheet name: {name: row}}, make them the only cached indexes of a workbook, valid at mtime"""
+        self.entries[path] = {"mtime": mtime, "sheets": dict(sheets)}
+
+    def save(self):
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, "w") as cache_file:
+            json.dump(self.entries, cache_file)
+        os.replace(temp_path, self.cache_path)
+
+
+class NameIndex:
+    """Name -> AM row of every month sheet of one EARS workbook"""
+
+    def __init__(self, workbook, sheets, use_cache=True):
+        """Given the EARS workbook and its month sheets, load every sheet's index from the cache
+        or build it from the sheet. The cache is keyed by the file on disk, so it is not read when
+        the workbook holds changes not saved yet (see ears_backend)"""
+        self.path = os.path.abspath(workbook.path)
+        self.cache = NameIndexCache(os.path.join(os.path.dirname(self.path), CACHE_FILE_NAME)) if use_cache else None
+        self.unsaved = workbook.unsaved_changes()
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        self.sheets = {}  # sheet name -> {trainee name: AM row}
+        self.scanned = {}  # the indexes read from the workbook rather than from the cache
+        for sheet in sheets:
+            names_dict = self.cache.get(self.path, mtime, sheet.name) if self.cache and not self.unsaved else None
+            if names_dict is None:
+                names_dict = self.scanned[sheet.name] = read_name_rows(sheet)
+                if self.cache and not self.unsaved:
+                    self.cache.put(self.path, mtime, sheet.name, names_dict)
+            self.sheets[sheet.name] = names_dict
+        if self.cache and self.scanned and not self.unsaved:
+            self.cache.save()
+
+    def row(self, sheet_name, name):
+        """Return the AM row of a trainee on a month sheet (the PM row is the next one), or None"""
+        return self.sheets.get(sheet_name, {}).get(name)
+
+    def workbook_saved(self):
+        """Call after the workbook was saved: the indexes scanned by this session describe the saved file (the
+        sync only changes the attendance columns), so they are cached for the next run. Those loaded from the
+        cache are not, the rows may have moved in Excel since"""
+        if self.cache and os.path.exists(self.path):
+            self.cache.replace(self.path, os.path.getmtime(self.path), self.scanned)
+            self.cache.save()
@@ -0,0 +1,277 @@
+"""Source schedule parsers.
+
+Each parser takes a source sheet read into memory (a SourceTable) and returns a
+list of AttendanceFact tuples: which trainee gets which code for which shift (AM or
+PM) on every day from start to end (inclusive). A block is one fact per shift for
+the whole date range rather than one per day, a single shift has start == end.
+source_row is a key identifying the source row a fact came from (stable across
+re-exports, it is not the row number), used by sync_state to find changed rows.
+Parsers never touch the EARS workbook; sync_pipeline turns the facts into marks.
+Every parser also takes a problems list: a message is added to it for each row that
+had to be skipped, and the caller reports them (parsing may run in a worker process).
+"""
+
+import re
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+
+from .ears_calendar import as_date
+
+AttendanceFact = namedtuple("AttendanceFact", ["trainee", "start", "end", "shift", "code", "source_row"])
+
+# a date-range header of the MGB block sheet, ex: "9/20 - 10/3"
+MGB_BLOCK_HEADER = re.compile(r"\s*(\d{1,2})/(\d{1,2})\s*-\s*(\d{1,2})/(\d{1,2})\s*")
+MGB_BLOCK_SKIPPED = {"Holiday Coverage"}  # entries under a header that are not trainees
+ACADEMIC_YEAR_START_MONTH = 7  # an academic year runs from July to June
+
+
+def clean_name(name):
+    """Given a name from a source sheet, remove the title in parenthesis
+    ex: "Vergara Greeno, Rebeca (DGM)" -> "Vergara Greeno, Rebeca" """
+    return name.split(' (')[0]
+
+
+def full_days(trainee, start, end, code, source_row):
+    """Return the AM and PM facts for a trainee on every day from start to end (inclusive)"""
+    start, end = as_date(start), as_date(end)
+    return [AttendanceFact(trainee, start, end, "AM", code, source_row),
+            AttendanceFact(trainee, start, end, "PM", code, source_row)]
+
+
+def half_day(trainee, date, shift, code, source_row):
+    """Return the fact for a single shift of a trainee"""
+    return AttendanceFact(trainee, as_date(date), as_date(date), shift, code, source_row)
+
+
+# ***************************************************************
+# MGB IM Block Schedule
+# ***************************************************************
+
+def parse_mgb_block(table, problems=None, academic_year=None):
+    """Given the MGB block sheet, return a full day fact for every name listed under a date-range header.
+    Header bands are found wherever they sit on the sheet (any row, any first column): every cell reading
+    like "9/20 - 10/3" is a header and the names under it run down to the first blank cell or header.
+    The year of each date comes from the academic year (July to June) the sheet is for, "AY24" -> July 2024
+    to June 2025, unless academic_year (the calendar year it starts in) is given"""
+    if academic_year is None:
+        academic_year = sheet_academic_year(table.name)
+    cells = table.array()
+    header_parts = match_headers(cells)  # re.Match of every header cell, None elsewhere
+    is_header = header_parts != None  # noqa: E711 (elementwise comparison)
+    is_name = ~is_header & is_text(cells).astype(bool)
+
+    # header_row[r, c] = row index of the header a name at (r, c) is listed under, -1 if it is under none
+    header_row = np.full(cells.shape, -1)
+    for r in range(1, cells.shape[0]):
+        header_row[r] = np.where(is_header[r - 1], r - 1, header_row[r - 1])
+        header_row[r][~is_name[r]] = -1
+    name_rows, name_cols = np.nonzero(header_row >= 0)
+    header_rows = header_row[name_rows, name_cols]
+
+    # every header parsed at once: the first date's year follows from the academic year (Jul-Dec, then Jan-Jun),
+    # so "6/23 - 7/6" is June 23 to July 6 of the second year; the last date is in the same year as the first
+    # unless it comes before it ("12/23 - 1/5" ends in January of the next year)
+    header_cells = [tuple(cell) for cell in np.argwhere(is_header)]
+    parts = np.array([[int(part) for part in header_parts[cell].groups()] for cell in header_cells],
+                     dtype=int).reshape(-1, 4)  # first month, first day, last month, last day
+    first_years = academic_year + (parts[:, 0] < ACADEMIC_YEAR_START_MONTH)
+    wraps = (parts[:, 2] < parts[:, 0]) | ((parts[:, 2] == parts[:, 0]) & (parts[:, 3] < parts[:, 1]))
+    years = np.stack([first_years, first_years + wraps], axis=1)
+    intervals = {cell: (date(first_year, first_month, first_day), date(last_year, last_month, last_day))
+                 for cell, (first_month, first_day, last_month, last_day), (first_year, last_year)
+                 in zip(header_cells, parts.tolist(), years.tolist())}
+
+    facts = []
+    for r, c, h in zip(name_rows, name_cols, header_rows):
+        name = cells[r, c]
+        if name in MGB_BLOCK_SKIPPED:
+            continue
+        start, end = intervals[(int(h), int(c))]
+        facts += full_days(clean_name(name), start, end, "P", f"{cells[h, c]}|{name}")
+    return facts
+
+
+match_headers = np.frompyfunc(lambda value: MGB_BLOCK_HEADER.fullmatch(value) if isinstance(value, str) else None, 1, 1)
+is_text = np.frompyfunc(lambda value: isinstance(value, str) and value.strip() != "", 1, 1)
+is_filled = np.frompyfunc(lambda value: value is not None and not (isinstance(value, str) and value.strip() == ""), 1, 1)
+
+
+def sheet_academic_year(sheet_name):
+    """Given the name of an MGB schedule sheet ("AY24"), return the calendar year its academic year starts in"""
+    match = re.search(r"AY\s*(\d{2})", sheet_name or "")
+    if match is None:
+        raise ValueError(f"can't tell the academic year of sheet {sheet_name!r}, expected a name like \"AY24\"")
+    return 2000 + int(match.group(1))
+
+
+# ***************************************************************
+# MGB IM Clinic Schedule ("VA Clinic Report" sheet)
+# ***************************************************************
+
+def parse_mgb_clinic(table, problems=None):
+    """Given the VA Clinic Report sheet, return a fact for every non blank cell.
+    Every trainee has two rows (AM then PM), row 1 holds the date of each column.
+    The sheet is handled as one array: the data block ends at the first blank name of column A (names sit on
+    every other row from row 2) and at the first two blank dates of row 1, every date is converted once and
+    the non blank cells of the block are picked with one mask"""
+    cells = table.array()
+    names = cells[1::2, 0] if cells.shape[1] else np.array([], dtype=object)  # rows 2, 4, 6, ... of column A
+    blank_names = np.nonzero(names == None)[0]  # noqa: E711 (elementwise comparison)
+    n_names = blank_names[0] if len(blank_names) else len(names)
+    headers = cells[0, 1:]
+    blank_headers = np.nonzero((headers[:-1] == None) & (headers[1:] == None))[0]  # noqa: E711
+    n_cols = blank_headers[0] if len(blank_headers) else len(headers)
+
+    block = cells[1:1 + 2 * n_names, 1:1 + n_cols]
+    dates = np.array([as_date(value) if value is not None else None for value in headers[:n_cols]], dtype=object)
+    booked = is_filled(block).astype(bool) & (dates != None)[np.newaxis, :]  # noqa: E711 (a column without a date can't be placed)
+    rows, cols = np.nonzero(booked)
+    trainees = [clean_name(name) for name in names[:n_names]]  # removes parenthesis to prevent indexing errors
+
+    facts = []
+    for row, col in zip(rows.tolist(), cols.tolist()):
+        name, shift_type, date = trainees[row // 2], ("AM", "PM")[row % 2], dates[col]  # even rows AM, odd rows PM
+        facts.append(AttendanceFact(name, date, date, shift_type, "P", f"{name}|{date}|{shift_type}"))
+    return facts
+
+
+# ***************************************************************
+# BMC Block ("Block IM" export, first sheet)
+# ***************************************************************
+
+def parse_bmc_block(table, problems=None):
+    """Given the BMC block sheet, return full day facts covering every block (start and end inclusive)
+    Note:  the trainee data is a BLOCK spreadsheet, full day shifts, remember to check both boxes """
+    return [fact for facts in parse_bmc_block_chunks([table], problems) for fact in facts]
+
+
+def parse_bmc_block_chunks(tables, problems=None):
+    """Given the BMC block sheet as consecutive chunks (see source_reader.iter_sheet_tables), yield the facts
+    of every chunk, up to the first row with no last name"""
+    for table, first_row, last_row in data_rows(tables, 2):
+        facts = []
+        # iterating down the BMC block spreadsheet until the row is empty (meaning no more inputs)
+        for row_count in range(first_row, last_row + 1):
+            # get the full name following the last_name, full_name format
+            full_name = table.cell(row_count, 1) + ", " + table.cell(row_count, 2)
+            rotation_type = get_rotation_type(table, row_count)
+            start, end = as_date(table.cell(row_count, 9)), as_date(table.cell(row_count, 10))
+            facts += full_days(full_name, start, end, rotation_type, f"{full_name}|{start}")
+        yield facts
+
+
+def data_rows(tables, data_first_row):
+    """Given consecutive chunks of a sheet whose rows from data_first_row down hold one record each, until the
+    first row with an empty column A, yield (table, first row, last row) of the records in every chunk"""
+    for table in tables:
+        first_row = max(table.first_row, data_first_row)
+        last_row = table.last_row(1, start_row=first_row)
+        if last_row >= first_row:
+            yield table, first_row, last_row
+        if last_row < table.end_row:  # the empty row is in this chunk, the rest of the sheet is not data
+            return
+
+
+def get_rotation_type(BMC_sheet, curr_row):
+    """Given the BMC block or assign sheet (read into memory) and the current row, retrieve and return a
+    string representing the rotation type (P or PTO)"""
+    rotation_defin = BMC_sheet.cell(curr_row, 6) # column 6 contains rotation definition
+    if "vacation" in str(rotation_defin or "").lower(): # a blank rotation counts as present
+        return "PTO" # Paid Time Off
+    else:
+        return "P" # Present
+
+
+# ***************************************************************
+# BMC Assign ("Assign Name" export, "Detail" sheet)
+# ***************************************************************
+
+ASSIGN_FIRST_ROW = 2
+HALF_DAY_MINUTES = 12 * 60  # AM is 00:00-12:00, PM is 12:00-24:00
+MIN_SLOT_HOURS = 3  # a shift marks the half day it starts in, and any other half day it covers for at least this long
+MAX_SHIFT_HOURS = 24
+
+
+def parse_bmc_assign(table, problems=None):
+    """Given the Detail sheet of the BMC assign workbook, return the half day facts of every shift
+    For the BMC Jul-Dec 2024 workbook, the excel sheet starts with row 3466"""
+    return [fact for facts in parse_bmc_assign_chunks([table], problems) for fact in facts]
+
+
+def parse_bmc_assign_chunks(tables, problems=None):
+    """Given the Detail sheet as consecutive chunks (see source_reader.iter_sheet_tables), yield the half day
+    facts of every chunk
+    Each chunk is handled column by column: start/end times are picked for every row at once and
+    map_shift_slots works out, from the real timestamps, which half days each shift covers"""
+    for table, first_row, last_row in data_rows(tables, ASSIGN_FIRST_ROW):
+        yield assign_rows_facts(table, first_row, last_row, problems)
+
+
+def assign_rows_facts(table, first_row, last_row, problems=None):
+    """Return the half day facts of the assign rows first_row to last_row of a table, the shifts that can't
+    be placed are skipped and described in problems"""
+    def column(col):
+        return table.column(col, first_row)[:last_row - first_row + 1]
+
+    names = np.array([f"{last}, {first}" for last, first in zip(column(1), column(2))], dtype=object)
+    rotations = np.array([str(rotation or "").lower() for rotation in column(6)])
+    codes = np.where(np.char.find(rotations, "vacation") >= 0, "PTO", "P")  # Paid Time Off / Present
+    hours = np.array([np.nan if value is None else float(value) for value in column(11)])
+    starts = pick_times(column(14), column(15))  # projected start, actual start
+    ends = pick_times(column(16), column(17))  # projected end, actual end
+
+    # shifts with no end time are assumed to last the recorded "Actual Hours"
+    no_end = np.isnat(ends) & ~np.isnan(hours)
+    ends[no_end] = starts[no_end] + (hours[no_end] * 60).astype("timedelta64[m]")
+
+    # if shift length is 0 hours, skip (cancelled shift)
+    keep = hours != 0
+    length = (ends - starts).astype("timedelta64[m]").astype(float) / 60
+    bad = keep & (np.isnat(starts) | np.isnat(ends) | ~(length > 0) | (length > MAX_SHIFT_HOURS))
+    if problems is not None:
+        problems += [f"Exception found for {names[i]}, shift starts: {starts[i]}, ends: {ends[i]}"
+                     for i in np.nonzero(bad)[0]]
+    keep &= ~bad
+
+    rows, dates, shifts = map_shift_slots(starts[keep], ends[keep])
+    kept = np.nonzero(keep)[0][rows]
+    # an assign row is identified by who works it and when it was scheduled to start
+    row_keys = np.array([f"{name}|{start}" for name, start in zip(names, column(14))])
+    return [half_day(name, date, str(shift), str(code), str(row_key))
+            for name, date, shift, code, row_key in zip(names[kept], dates, shifts, codes[kept], row_keys[kept])]
+
+
+def pick_times(projected, actual):
+    """Given the projected and actual time columns, return a datetime64[m] array holding the
+    actual time where one is recorded and differs from the projected one, else the projected time"""
+    projected = np.array(projected, dtype="datetime64[m]")
+    actual = np.array(actual, dtype="datetime64[m]")
+    return np.where(np.isnat(actual), projected, actual)
+
+
+def map_shift_slots(starts, ends):
+    """Given datetime64[m] arrays of shift starts and ends, return three arrays (shift index, date, "AM"/"PM"),
+    one entry per half day covered: the half day the shift starts in, plus every following half day
+    (on any date, across month ends) that the shift covers for at least MIN_SLOT_HOURS"""
+    start_minutes = starts.astype("int64")
+    end_minutes = ends.astype("int64")
+    first_slot = start_minutes // HALF_DAY_MINUTES
+    last_slot = (end_minutes - 1) // HALF_DAY_MINUTES
+    width = int((last_slot - first_slot).max()) + 1 if len(first_slot) else 0
+
+    slots = first_slot[:, None] + np.arange(width)[None, :]  # every candidate half day of every shift
+    overlap = (np.minimum(end_minutes[:, None], (slots + 1) * HALF_DAY_MINUTES)
+               - np.maximum(start_minutes[:, None], slots * HALF_DAY_MINUTES))
+    covered = (slots <= last_slot[:, None]) & ((slots == first_slot[:, None]) | (overlap >= MIN_SLOT_HOURS * 60))
+
+    rows, offsets = np.nonzero(covered)
+    slot = slots[rows, offsets]
+    dates = (slot // 2).astype("datetime64[D]").astype(object)  # days since 1970-01-01 -> date objects
+    shifts = np.where(slot % 2 == 0, "AM", "PM")
+    return rows, dates, shifts
+
+
+# parsers that can take a sheet in chunks -> their chunked version
+CHUNKED_PARSERS = {parse_bmc_block: parse_bmc_block_chunks, parse_bmc_assign: parse_bmc_assign_chunks}
@@ -0,0 +1,138 @@
+"""Batched writes for EARS workbooks.
+
+Writing every attendance mark with its own range assignment and then saving the
+whole workbook is what dominates the run time on the multi-MB .xlsm files. The
+WritePlan below collects (sheet, row, col, code) marks in an AttendanceGrid per
+month sheet instead, flushes each sheet as a few rectangular range assignments of
+the cells that actually change and saves the workbook once at the end (or every
+`checkpoint_interval` marks if asked to). With a WriteJournal (see sync_journal)
+every range of a flush is journaled before any of them is written and every save is
+journaled after it.
+
+Marks of every source for the same half day are merged in the grid first (the
+higher precedence value wins, see ears_grid), so each cell is written at most once
+per run. The grids are kept across checkpoints and a flush only writes what changed
+since the last one, so a checkpoint writes a cell again only when a mark of higher
+precedence comes after it, never a lower one.
+"""
+
+from .ears_grid import DAYS, DEFAULT_PRECEDENCE, FIRST_DAY_COL, AttendanceGrid
+from .ears_names import FIRST_NAME_ROW, LAST_NAME_ROW
+
+
+def plan_rectangles(marks):
+    """Given a dictionary of {(row, col): value}, return a list of (row, col, values)
+    tuples where values is a 2D list covering a rectangle made only of marked cells.
+    Unmarked cells are never part of a rectangle, so nothing else on the sheet gets overwritten"""
+    # first find the runs of consecutive columns in every row
+    runs = {}  # (first col, last col) -> list of (row, values)
+    rows = {}
+    for (row, col), value in marks.items():
+        rows.setdefault(row, {})[col] = value
+    for row in sorted(rows):
+        cols = sorted(rows[row])
+        start = 0
+        for i in range(1, len(cols) + 1):
+            if i == len(cols) or cols[i] != cols[i - 1] + 1:
+                run_cols = cols[start:i]
+                values = [rows[row][col] for col in run_cols]
+                runs.setdefault((run_cols[0], run_cols[-1]), []).append((row, values))
+                start = i
+
+    # then stack runs that cover the same columns on consecutive rows (ex: the AM and PM row of a trainee)
+    rectangles = []
+    for (first_col, _), row_runs in sorted(runs.items()):
+        block_row, block = row_runs[0][0], [row_runs[0][1]]
+        for row, values in row_runs[1:]:
+            if row == block_row + len(block):
+                block.append(values)
+            else:
+                rectangles.append((block_row, first_col, block))
+                block_row, block = row, [values]
+        rectangles.append((block_row, first_col, block))
+    return rectangles
+
+
+class WritePlan:
+    """Collects attendance marks for one EARS workbook and writes them in bulk"""
+
+    def __init__(self, workbook, checkpoint_interval=None, journal=None, precedence=DEFAULT_PRECEDENCE):
+        """Given the EARS workbook (see ears_backend), create an empty plan. precedence lists the values the sync
+        writes, highest first. If checkpoint_interval is set, the plan is committed every time that many marks are queued"""
+        self.workbook = workbook
+        self.checkpoint_interval = checkpoint_interval
+        self.journal = journal
+        self.precedence = precedence
+        self._sheets = {}  # sheet name -> sheet object
+        self._grids = {}  # sheet name -> AttendanceGrid
+        self._pending = 0
+        self.marks_queued = 0  # half days queued by all sources, before merging
+        self.cells_written = 0  # cells that were actually written
+        self.cells_unchanged = 0  # marked cells that already held the right value
+
+    def grid(self, sheet):
+        """Return the attendance grid of a sheet, creating an empty one the first time"""
+        if sheet.name not in self._grids:
+            self._sheets[sheet.name] = sheet
+            self._grids[sheet.name] = AttendanceGrid(self.precedence)
+        return self._grids[sheet.name]
+
+    def add(self, sheet, row, col, code, source=None):
+        """Queue code to be written into (row, col) of the given EARS sheet"""
+        return self.add_run(sheet, row, col, col, code, source)
+
+    def add_run(self, sheet, row, first_col, last_col, code, source=None):
+        """Queue code to be written into every column from first_col to last_col (inclusive) of a row, on behalf
+        of source. Return the conflicts with marks queued before (see AttendanceGrid.set_run)"""
+        conflicts = self.grid(sheet).set_run(row, first_col, last_col, code, source)
+        self._pending += last_col - first_col + 1
+        self.marks_queued += last_col - first_col + 1
+        if self.checkpoint_interval and self._pending >= self.checkpoint_interval:
+            self.commit()
+        return conflicts
+
+    def flush(self, last=False):
+        """Write every mark queued since the last flush that differs from the sheet (without saving). The data
+        region of each sheet is read once to find the changed cells, which are written one range assignment per
+        rectangle. The grids are kept, so marks queued later are still merged with these. With a journal every
+        rectangle of every sheet is journaled before any is written; last=True notes in the journal that the
+        plan is complete (no mark will be queued after this flush)"""
+        writes = []  # (sheet name, grid, marked cells, changed cells, rectangles) of every sheet to write
+        for name, grid in self._grids.items():
+            unflushed = grid.unflushed()
+            if not unflushed:
+                continue
+            current = self._sheets[name].read(FIRST_NAME_ROW, FIRST_DAY_COL, LAST_NAME_ROW + 1,
+                                              FIRST_DAY_COL + DAYS - 1)
+            changes = grid.changes(current)
+            writes.append((name, grid, unflushed, len(changes), plan_rectangles(changes)))
+        if self.journal and (writes or last):
+            for name, _, _, _, rectangles in writes:
+                for row, col, values in rectangles:
+                    self.journal.planned(name, row, col, values)
+            self.journal.journaled(last)
+        for name, grid, unflushed, changed, rectangles in writes:
+            sheet = self._sheets[name]
+            for row, col, values in rectangles:
+                sheet.write(row, col, values)
+            self.cells_written += changed
+            self.cells_unchanged += unflushed - changed
+            grid.set_flushed()
+        self._pending = 0
+
+    def diff(self):
+        """Compare every queued mark with the sheets instead of writing it: the data region of each sheet is read
+        once. Return {sheet name: {(row, col): (kind, expected value, sheet value)}} (see AttendanceGrid.diff)"""
+        differences = {}
+        for name, grid in self._grids.items():
+            sheet = self._sheets[name]
+            current = sheet.read(FIRST_NAME_ROW, FIRST_DAY_COL, LAST_NAME_ROW + 1, FIRST_DAY_COL + DAYS - 1)
+            differences[name] = grid.diff(current)
+        return differences
+
+    def commit(self):
+        """Flush every queued mark and save the workbook once"""
+        self.flush()
+        self.workbook.save()
+        if self.journal:
+            self.journal.saved()
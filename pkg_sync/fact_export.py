@@ -0,0 +1,85 @@
+"""Columnar export of the attendance facts of a run.
+
+Reports built on the EARS workbook (FINAL RECONCILIATION, EAR_OVERVIEW rollups, audits)
+used to scrape the .xlsm again. With an export path the sync also writes every fact it
+parsed as one row per half day:
+
+    site, trainee, date, shift, code, source, source_row
+
+to a CSV file, or to a Parquet file when the path ends in .parquet (needs pyarrow:
+pip install pyarrow). Rows are written in chunks of CHUNK_ROWS as the sources come in,
+so the exploded table never sits in memory as a whole. The file is written under a
+temporary name and only takes its final name once the run is done.
+"""
+
+import csv
+import os
+from datetime import timedelta
+
+EXPORT_COLUMNS = ("site", "trainee", "date", "shift", "code", "source", "source_row")
+CHUNK_ROWS = 50000
+
+
+def fact_rows(site, source, facts, name_of=None):
+    """Given the facts of a source, yield one export row per half day. name_of maps a source name to the name
+    the row should carry (ex: the EARS name it resolves to), by default the source name is kept"""
+    for fact in facts:
+        trainee = name_of(fact.trainee) if name_of else fact.trainee
+        for offset in range((fact.end - fact.start).days + 1):
+            yield (site, trainee, fact.start + timedelta(days=offset), fact.shift, fact.code, source, fact.source_row)
+
+
+class FactExport:
+    """Streams export rows to a CSV or Parquet file, CHUNK_ROWS at a time"""
+
+    def __init__(self, path, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.parquet = path.lower().endswith(".parquet")
+        self.temp_path = path + ".tmp"
+        self.rows_written = 0
+        self._chunk = []
+        if self.parquet:
+            import pyarrow  # pip install pyarrow
+            import pyarrow.parquet
+            self.pyarrow = pyarrow
+            self.schema = pyarrow.schema([("site", pyarrow.string()), ("trainee", pyarrow.string()),
+                                          ("date", pyarrow.date32()), ("shift", pyarrow.string()),
+                                          ("code", pyarrow.string()), ("source", pyarrow.string()),
+                                          ("source_row", pyarrow.string())])
+            self._writer = pyarrow.parquet.ParquetWriter(self.temp_path, self.schema)
+        else:
+            self._file = open(self.temp_path, "w", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(EXPORT_COLUMNS)
+
+    def add(self, site, source, facts, name_of=None):
+        """Queue the rows of a source's facts (see fact_rows), writing every full chunk"""
+        for row in fact_rows(site, source, facts, name_of):
+            self._chunk.append(row)
+            if len(self._chunk) >= self.chunk_rows:
+                self.flush()
+
+    def flush(self):
+        """Write the queued rows (one Parquet row group, or CSV lines)"""
+        if not self._chunk:
+            return
+        if self.parquet:
+            columns = list(zip(*self._chunk))
+            columns[-1] = [str(source_row) for source_row in columns[-1]]  # a row number or a text key, by source
+            self._writer.write_table(self.pyarrow.table(
+                {name: list(column) for name, column in zip(EXPORT_COLUMNS, columns)}, schema=self.schema))
+        else:
+            self._writer.writerows((site, trainee, day.isoformat(), shift, code or "", source, source_row)
+                                   for site, trainee, day, shift, code, source, source_row in self._chunk)
+        self.rows_written += len(self._chunk)
+        self._chunk = []
+
+    def close(self):
+        """Write what is left and give the file its final name"""
+        self.flush()
+        if self.parquet:
+            self._writer.close()
+        else:
+            self._file.close()
+        os.replace(self.temp_path, self.path)
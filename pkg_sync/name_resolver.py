@@ -0,0 +1,203 @@
+"""Source name -> EARS name matching.
+
+The schedule exports don't always spell a trainee the way the EARS workbook does:
+different case or spacing, accents, a hyphen in a double surname, a middle name
+("Last, First Middle" vs "Last, First"). NameResolver is built once per EARS
+workbook from the names on its month sheets and resolves every source name once
+per run, trying in order:
+
+    alias      the alias file next to the EARS workbook says which EARS name it is
+    exact      the name (without its "(title)") is on the sheets as is
+    normalized same name once case, accents, hyphens, dots and spacing are ignored,
+               or the same last and first name when one of the two has no middle name
+               ("Smith, Anna Marie" and "Smith, Anna", not "Lee, Min Jun" and "Lee, Min Seo")
+
+A name none of these find is never guessed: a trainee who is not on the EARS sheets
+yet must not get their attendance written on someone else's row. Instead the closest
+EARS name is written to the alias file (.ears_name_aliases.json) as a suggestion: the
+only one with the same last name and a first name that starts the other one ("Kim,
+Jin" and "Kim, Jina"), else the EARS names sharing the most character trigrams are
+compared by edit similarity and the closest (at least the threshold, with no other
+candidate coming close) is suggested:
+
+    "Smyth, Anna": {"suggested": "Smith, Anna", "similarity": 0.91}
+
+The name stays unmatched until someone confirms it by replacing the suggestion with
+the EARS name ("Smyth, Anna": "Smith, Anna"), or sets it to null to stop suggesting.
+"""
+
+import json
+import os
+import unicodedata
+from difflib import SequenceMatcher
+
+from .ears_sources import clean_name
+
+ALIAS_FILE_NAME = ".ears_name_aliases.json"
+DEFAULT_THRESHOLD = 0.85  # edit similarity (0-1) a suggestion needs, 1 turns suggestions off
+MIN_MARGIN = 0.05  # how much better than the runner up a suggestion has to be
+CANDIDATES = 5  # EARS names (most shared trigrams first) compared by edit similarity
+_AMBIGUOUS = object()  # a normalized key shared by two different EARS names
+
+
+def normalize_name(name):
+    """Given a name, return it without title, accents, case, hyphens, dots and extra spaces
+    ex: "Vergara-Greeno,  Rebéca (DGM)" -> "vergara greeno, rebeca" """
+    name = unicodedata.normalize("NFKD", clean_name(str(name)))
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    name = name.casefold().replace("-", " ").replace(".", "")
+    last, _, first = name.partition(",")
+    return " ".join(last.split()) + ", " + " ".join(first.split())
+
+
+def short_key(key):
+    """Given a normalized name, drop the middle names ("smith, anna marie" -> "smith, anna")"""
+    last, _, first = key.partition(", ")
+    return last + ", " + (first.split() or [""])[0]
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameResolver:
+    """Resolves source names to the names written on the EARS sheets"""
+
+    def __init__(self, ears_names, alias_path=None, threshold=DEFAULT_THRESHOLD):
+        """Given every name on the EARS sheets, the alias file (None to not use one) and the suggestion threshold,
+        build the lookup tables"""
+        self.ears_names = list(dict.fromkeys(ears_names))
+        self.known = set(self.ears_names)
+        self.alias_path = alias_path
+        self.threshold = threshold
+        self.aliases = {}
+        self.problems = []  # messages for the caller to report
+        if alias_path and os.path.exists(alias_path):
+            try:
+                with open(alias_path) as alias_file:
+                    self.aliases = json.load(alias_file)
+            except (OSError, ValueError):
+                self.problems.append(f"Could not read {alias_path}, name aliases are ignored this run")
+        self._added_aliases = {}  # suggestions to add to the alias file
+
+        self._keys = {}  # normalized name -> EARS name
+        self._short_keys = {}  # normalized name without middle names -> EARS name
+        self._last_names = {}  # normalized last name -> indexes of the EARS names holding it
+        self._trigrams = {}  # trigram -> indexes of the EARS names holding it
+        self._normalized = []  # index -> normalized EARS name
+        for i, name in enumerate(self.ears_names):
+            key = normalize_name(name)
+            for table, table_key in ((self._keys, key), (self._short_keys, short_key(key))):
+                if table.get(table_key, name) != name:
+                    table[table_key] = _AMBIGUOUS
+                else:
+                    table[table_key] = name
+            self._normalized.append(key)
+            self._last_names.setdefault(key.partition(", ")[0], []).append(i)
+            for gram in trigrams(key):
+                self._trigrams.setdefault(gram, []).append(i)
+
+        self._resolved = {}  # source name -> (EARS name or None, how)
+        self.suggestions = []  # (source name, suggested EARS name, similarity) not confirmed yet
+
+    def resolve(self, source_name):
+        """Given a name from a source sheet, return the EARS name it belongs to, or None"""
+        if source_name not in self._resolved:
+            self._resolved[source_name] = self._match(source_name)
+        return self._resolved[source_name][0]
+
+    def _match(self, source_name):
+        name = clean_name(source_name)
+        for alias in (source_name, name):
+            if alias in self.aliases:
+                target = self.aliases[alias]
+                if isinstance(target, dict) and target.get("suggested") in self.known:
+                    self.suggestions.append((name, target["suggested"], target.get("similarity", 0.0)))
+                    return None, "suggested"
+                if target is None or target in self.known:  # aliases to names of another workbook are skipped
+                    return target, "alias"
+        if name in self.known:
+            return name, "exact"
+        key = normalize_name(name)
+        match = self._keys.get(key)
+        if match is None:  # middle names only one of the two has ("smith, anna marie" and "Smith, Anna")
+            short = short_key(key)
+            match = self._keys.get(short) if short != key else self._short_keys.get(key)
+        if match is not None and match is not _AMBIGUOUS:
+            return match, "normalized"
+        if self.threshold >= 1:
+            return None, "unmatched"
+        match = self.prefix(key)
+        if match is not None:
+            similarity = SequenceMatcher(None, key, normalize_name(match)).ratio()
+        else:
+            match, similarity = self.fuzzy(key)
+        if match is None:
+            return None, "unmatched"
+        self.suggestions.append((name, match, similarity))
+        self.aliases[name] = self._added_aliases[name] = {"suggested": match, "similarity": round(similarity, 2)}
+        return None, "suggested"
+
+    def prefix(self, key):
+        """Given a normalized name, return the only EARS name to suggest with the same last name and a first name
+        that starts the other one (ex: "kim, jin" and "Kim, Jina"), or None"""
+        last, _, first = key.partition(", ")
+        first = (first.split() or [""])[0]
+        if not first:
+            return None
+        matches = set()
+        for i in self._last_names.get(last, []):
+            ears_first = (self._normalized[i].partition(", ")[2].split() or [""])[0]
+            if ears_first and (ears_first.startswith(first) or first.startswith(ears_first)):
+                matches.add(self.ears_names[i])
+        return matches.pop() if len(matches) == 1 else None
+
+    def fuzzy(self, key):
+        """Given a normalized name, return (EARS name, similarity) of the closest EARS name to suggest, or (None, best
+        similarity) if it is under the threshold or another name is about as close. Only the CANDIDATES names
+        sharing the most trigrams with key are compared character by character"""
+        shared = {}
+        for gram in trigrams(key):
+            for i in self._trigrams.get(gram, []):
+                shared[i] = shared.get(i, 0) + 1
+        candidates = sorted(shared, key=shared.get, reverse=True)[:CANDIDATES]
+        scores = sorted(((SequenceMatcher(None, key, self._normalized[i]).ratio(), i) for i in candidates), reverse=True)
+        if not scores or scores[0][0] < self.threshold:
+            return None, scores[0][0] if scores else 0.0
+        if len(scores) > 1 and scores[0][0] - scores[1][0] < MIN_MARGIN:
+            return None, scores[0][0]
+        return self.ears_names[scores[0][1]], scores[0][0]
+
+    def counts(self):
+        """Return {how: number of source names} for the names resolved so far (exact, normalized, suggested, ...)"""
+        counts = {}
+        for _, how in self._resolved.values():
+            counts[how] = counts.get(how, 0) + 1
+        return counts
+
+    def save(self):
+        """Add the suggestions of this run to the alias file. The file is read again first, so aliases another
+        resolver saved in the meantime (ex: the one of another workbook in the same folder) and entries someone
+        confirmed in the meantime are kept"""
+        if not (self.alias_path and self._added_aliases):
+            return
+        if os.path.exists(self.alias_path):
+            try:
+                with open(self.alias_path) as alias_file:
+                    self.aliases = {**self._added_aliases, **json.load(alias_file)}
+            except (OSError, ValueError):
+                pass
+        temp_path = self.alias_path + ".tmp"
+        with open(temp_path, "w") as alias_file:
+            json.dump(self.aliases, alias_file, indent=1, sort_keys=True)
+        os.replace(temp_path, self.alias_path)
+        self._added_aliases = {}
+
+
+def resolver_for(name_index, threshold=DEFAULT_THRESHOLD, use_aliases=True):
+    """Given the NameIndex of an EARS workbook, return a NameResolver over the names of all its month sheets,
+    using the alias file next to the workbook"""
+    names = [name for names_dict in name_index.sheets.values() for name in names_dict]
+    alias_path = os.path.join(os.path.dirname(name_index.path), ALIAS_FILE_NAME) if use_aliases else None
+    return NameResolver(names, alias_path, threshold)
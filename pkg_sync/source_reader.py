@@ -0,0 +1,69 @@
+"""In-memory reads of source schedule sheets.
+
+The source parsers used to ask Excel for one cell at a time (including the scans
+that find how big a sheet is). read_sheet_table pulls the whole used range of a
+sheet in one call and every parser works against the resulting SourceTable.
+
+Row-by-row exports that keep growing (BMC assign, BMC block) can instead be read
+with iter_sheet_tables, which yields the sheet as SourceTables of CHUNK_ROWS rows
+each, so only one chunk of raw cell values is held in memory at a time.
+"""
+
+import numpy as np
+
+CHUNK_ROWS = 5000
+
+
+class SourceTable:
+    """A sheet's values held in memory as a list of rows, addressed with 1 based (row, col)
+    numbers like the worksheet itself. Cells outside the table read as None.
+    A chunk of a sheet starts at first_row, its cells keep their worksheet row numbers"""
+
+    def __init__(self, rows, name=None, first_row=1):
+        self.rows = [list(row) for row in rows]
+        self.name = name
+        self.first_row = first_row
+        self.n_rows = len(self.rows)
+        self.n_cols = max((len(row) for row in self.rows), default=0)
+        self.end_row = first_row + self.n_rows - 1  # worksheet row number of the last row of the table
+
+    def cell(self, row, col):
+        """Return the value at (row, col), or None if the position is outside the table"""
+        if row < self.first_row or row > self.end_row:
+            return None
+        values = self.rows[row - self.first_row]
+        if col < 1 or col > len(values):
+            return None
+        return values[col - 1]
+
+    def array(self):
+        """Return the table as a 2D NumPy object array (rows padded with None to the widest row),
+        array[0, 0] being the first cell of the table"""
+        return np.array([row + [None] * (self.n_cols - len(row)) for row in self.rows] or [[]], dtype=object)
+
+    def column(self, col, start_row=1):
+        """Return the values of a column from start_row to the last row of the table"""
+        return [self.cell(row, col) for row in range(start_row, self.end_row + 1)]
+
+    def last_row(self, col, start_row=1, step=1):
+        """Starting at start_row and moving down step rows at a time, return the last row
+        before the first empty cell of the column (start_row - step if start_row itself is empty)"""
+        row = start_row
+        while self.cell(row, col) is not None:
+            row += step
+        return row - step
+
+
+def read_sheet_table(sheet):
+    """Given a sheet (see ears_backend), read everything from A1 to the last used cell
+    in one call and return it as a SourceTable"""
+    return SourceTable(sheet.used_values(), sheet.name)
+
+
+def iter_sheet_tables(sheet, chunk_rows=CHUNK_ROWS):
+    """Given a sheet (see ears_backend), yield consecutive SourceTables of chunk_rows rows (the last one
+    may be shorter) from A1 down to the last used row"""
+    first_row = 1
+    for rows in sheet.iter_chunks(chunk_rows):
+        yield SourceTable(rows, sheet.name, first_row)
+        first_row += len(rows)
@@ -0,0 +1,119 @@
+"""Snapshots of parsed source workbooks.
+
+Reconciling an EARS workbook means running the same source files again and again.
+After a source is parsed, its facts are stored as a columnar snapshot: a folder of
+.npy files (one per AttendanceFact field, plus the rows the parser had to skip) in
+.ears_snapshots next to the source file.
+The folder name is a hash of the file's content, of the sheet and parser used and of
+the parser code, so a later run on the same file memory-maps the columns instead of
+opening the workbook, and any change to the file or to ears_sources makes a new one.
+
+Note: the hash is taken from the file on disk, edits made in Excel and not saved yet
+are only picked up with snapshots turned off.
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from .ears_sources import AttendanceFact
+
+SNAPSHOT_FOLDER_NAME = ".ears_snapshots"
+SNAPSHOT_VERSION = "1"  # bump when the layout below changes
+KEEP_SNAPSHOTS = 12  # older snapshots in a folder are deleted
+
+
+def file_stamp(path):
+    """Return (modification time, size) of a file, or None if it doesn't exist (cheap change detection)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_digest(path, algorithm="sha1"):
+    """Return the hex digest of a file's content, read in 1 MB chunks"""
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as source_file:
+        for chunk in iter(lambda: source_file.read(2**20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_key(path, sheet_name, parser):
+    """Return the name of the snapshot of a source: changes with the file, the sheet, the parser and its code"""
+    parser_file = sys.modules[parser.__module__].__file__
+    key = "|".join([SNAPSHOT_VERSION, file_digest(path), str(sheet_name), parser.__name__, file_digest(parser_file)])
+    return hashlib.sha1(key.encode()).hexdigest()[:24]
+
+
+def facts_to_columns(facts):
+    """Given attendance facts, return {column: array}. Trainee names are stored once with an index per fact"""
+    trainees, trainee_index = np.unique(np.array([fact.trainee for fact in facts], dtype=str), return_inverse=True)
+    return {
+        "trainees": trainees,
+        "trainee_index": trainee_index.astype(np.int32),
+        "start": np.array([fact.start for fact in facts], dtype="datetime64[D]"),
+        "end": np.array([fact.end for fact in facts], dtype="datetime64[D]"),
+        "shift": np.array([fact.shift for fact in facts], dtype="U2"),
+        "code": np.array([fact.code or "" for fact in facts], dtype="U3"),  # "" for a clear
+        "source_row": np.array([fact.source_row for fact in facts], dtype=str),
+    }
+
+
+def columns_to_facts(columns):
+    """Inverse of facts_to_columns"""
+    trainees = columns["trainees"][columns["trainee_index"]].tolist()
+    codes = [code or None for code in columns["code"].tolist()]
+    return [AttendanceFact(*values) for values in zip(trainees, columns["start"].tolist(), columns["end"].tolist(),
+                                                      columns["shift"].tolist(), codes, columns["source_row"].tolist())]
+
+
+class SnapshotCache:
+    """The snapshots of the sources in one folder"""
+
+    def __init__(self, source_path):
+        self.folder = os.path.join(os.path.dirname(os.path.abspath(source_path)), SNAPSHOT_FOLDER_NAME)
+
+    def get(self, key):
+        """Return (facts, problems) of a snapshot (its columns memory-mapped), or None if there is no such
+        snapshot"""
+        path = os.path.join(self.folder, key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            columns = {name[:-4]: np.load(os.path.join(path, name), mmap_mode="r")
+                       for name in os.listdir(path) if name.endswith(".npy")}
+            facts = columns_to_facts(columns)
+            problems = columns["problems"].tolist() if "problems" in columns else []
+        except (OSError, ValueError, KeyError):
+            return None  # unreadable snapshot, the source gets parsed again
+        os.utime(path)  # recently used snapshots are the last ones pruned
+        return facts, problems
+
+    def put(self, key, facts, problems=()):
+        """Store the facts of a source and the problems its parser reported as a snapshot (written to a temp
+        folder, then renamed into place)"""
+        path = os.path.join(self.folder, key)
+        temp_path = path + f".tmp{os.getpid()}"
+        os.makedirs(temp_path, exist_ok=True)
+        for name, values in facts_to_columns(facts).items():
+            np.save(os.path.join(temp_path, name + ".npy"), values)
+        if problems:
+            np.save(os.path.join(temp_path, "problems.npy"), np.array(problems, dtype=str))
+        try:
+            os.replace(temp_path, path)
+        except OSError:  # another process stored the same snapshot first
+            shutil.rmtree(temp_path, ignore_errors=True)
+        self.prune()
+
+    def prune(self, keep=KEEP_SNAPSHOTS):
+        """Delete all but the keep most recently used snapshots"""
+        snapshots = [os.path.join(self.folder, name) for name in os.listdir(self.folder) if ".tmp" not in name]
+        snapshots.sort(key=os.path.getmtime, reverse=True)
+        for path in snapshots[keep:]:
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,130 @@
+"""Write-ahead journal of the cells a sync writes into an EARS workbook.
+
+Before a flush writes anything into the workbook, every range it is about to write
+(sheet, top left cell, values) is appended to the workbook's own journal file next to
+it (several EARS workbooks in one folder, ex: AY24 and AY25, each have theirs),
+followed by a "journaled" line, and the file is fsynced; every save of the workbook
+appends a "saved" line. Everything journaled before the last "saved" line is
+committed (on disk in the workbook), whatever comes after it was planned and maybe
+written but not saved. The "journaled" line of the last flush of a run says so
+("last": true): from there on the journal holds the whole plan of the run. A run that
+finishes empties the journal.
+
+If a run dies halfway (Excel hangs, the script crashes), the journal still holds the
+ranges that were not saved: resume replays them into the workbook and saves it, no
+source has to be parsed again. If the run died before its last flush was journaled,
+part of its plan is only in memory and lost: resume writes what it can and says the
+sync has to be run again. The sync state keeps the rows of the last finished
+run, so the next normal run still checks every row that changed since then.
+"""
+
+import json
+import os
+import time
+
+JOURNAL_SUFFIX = ".ears_sync_journal.jsonl"
+BATCH_SIZE = 500  # ranges buffered before the journal is written and fsynced
+
+
+def journal_path(ears_path):
+    """Return the journal of an EARS workbook, ex: .Internal Medicine EARs AY25 BMC.xlsm.ears_sync_journal.jsonl"""
+    ears_path = os.path.abspath(ears_path)
+    return os.path.join(os.path.dirname(ears_path), "." + os.path.basename(ears_path) + JOURNAL_SUFFIX)
+
+
+class WriteJournal:
+    """Append-only journal of the ranges written into one EARS workbook"""
+
+    def __init__(self, ears_path, batch_size=BATCH_SIZE):
+        self.ears_path = os.path.abspath(ears_path)
+        self.path = journal_path(ears_path)
+        self.batch_size = batch_size
+        self._buffer = []
+        self.run = None
+
+    def _append(self, record):
+        self._buffer.append(json.dumps(record, default=str))
+        if len(self._buffer) >= self.batch_size:
+            self.sync()
+
+    def sync(self):
+        """Write the buffered lines and fsync the journal, so they survive a crash"""
+        if not self._buffer:
+            return
+        with open(self.path, "a") as journal_file:
+            journal_file.write("\n".join(self._buffer) + "\n")
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        self._buffer = []
+
+    def begin(self, **info):
+        """Start the journal of a run, info (site, sources, ...) is kept for resume to report"""
+        self.run = time.strftime("%Y%m%d-%H%M%S")
+        self._append({"event": "begin", "run": self.run, "ears": self.ears_path, **info})
+        self.sync()
+
+    def planned(self, sheet_name, row, col, values):
+        """Record a range about to be written (call journaled before writing it)"""
+        self._append({"event": "planned", "run": self.run, "sheet": sheet_name, "row": row, "col": col,
+                      "values": values})
+
+    def journaled(self, last=False):
+        """Record that every range of a flush is journaled and fsync, the ranges may be written from now on.
+        last=True if no range will be planned after these"""
+        self._append({"event": "journaled", "run": self.run, "last": last})
+        self.sync()
+
+    def saved(self):
+        """Record that the workbook was saved: every range journaled so far is committed"""
+        self._append({"event": "saved", "run": self.run})
+        self.sync()
+
+    def done(self):
+        """Record the end of the run and empty the journal"""
+        self._buffer = []
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def read_journal(ears_path):
+    """Return the records of the journal next to an EARS workbook (a half written last line is skipped)"""
+    path = journal_path(ears_path)
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path) as journal_file:
+        for line in journal_file:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                pass  # the crash happened while this line was written
+    return records
+
+
+def unfinished_run(ears_path):
+    """Return (begin record, committed ranges, uncommitted ranges, complete) of the last run that did not finish,
+    or None. Ranges are the "planned" records of the flushes that were journaled whole, committed ones were
+    followed by a "saved" line (ranges of a flush cut short while being journaled were never written). complete
+    is True if the last flush of the run was journaled, so the ranges cover its whole plan"""
+    ears_path = os.path.abspath(ears_path)
+    records = read_journal(ears_path)
+    begins = [i for i, record in enumerate(records)
+              if record["event"] == "begin" and record.get("ears", ears_path) == ears_path]
+    if not begins:
+        return None
+    run_records = records[begins[-1]:]
+    if any(record["event"] == "done" for record in run_records):
+        return None
+    committed, uncommitted, flush = [], [], []
+    complete = False
+    for record in run_records[1:]:
+        if record["event"] == "planned":
+            flush.append(record)
+        elif record["event"] == "journaled":
+            uncommitted += flush
+            flush = []
+            complete = complete or record.get("last", False)
+        elif record["event"] == "saved":
+            committed += uncommitted
+            uncommitted = []
+    return run_records[0], committed, uncommitted, complete
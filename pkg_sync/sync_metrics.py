@@ -0,0 +1,213 @@
+"""Counters, timers and console output of a sync run.
+
+Every call that crosses into a workbook (a range read, a range write, a save) is
+what costs time, with xlwings each one is a round trip to Excel. instrument() wraps
+a backend workbook so every such call is counted and timed per workbook and per
+sheet, and PhaseTimer adds up the time spent in each phase of the run (open, index,
+parse, plan, flush, save). At the end of a run SyncMetrics.summary() returns all of
+it as a JSON-ready dictionary.
+
+Console output goes through SyncMetrics.log with a verbosity level:
+
+    QUIET    nothing but problems (names not found, dates with no sheet)
+    NORMAL   a line per source, cells written, timings
+    VERBOSE  also the workbook round trips per sheet
+    DEBUG    also every range written ("set I13:J14 in EAR_Jul_24")
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+
+QUIET, NORMAL, VERBOSE, DEBUG = 0, 1, 2, 3
+
+SHEET_COUNTERS = ["reads", "cells_read", "read_seconds", "writes", "cells_written", "write_seconds"]
+WORKBOOK_COUNTERS = ["opens", "saves", "save_seconds"]
+
+
+class PhaseTimer:
+    """Adds up the wall-clock time spent in each named phase of a run. Phases may be nested
+    (a save inside a checkpoint of the plan phase), the time of a nested phase only counts for it"""
+
+    def __init__(self):
+        self.totals = {}
+        self._nested = []  # for every open phase, the time spent in phases nested inside it
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.totals[name] = self.totals.get(name, 0.0) + elapsed - self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def report(self):
+        """Return the per phase timings as printable lines"""
+        lines = [f"  {name:<8} {seconds:8.2f}s" for name, seconds in self.totals.items()]
+        lines.append(f"  {'total':<8} {sum(self.totals.values()):8.2f}s")
+        return "\n".join(lines)
+
+
+def column_letter(col):
+    """Given a 1 based column number, return its letters (1 -> "A", 28 -> "AB")"""
+    letters = ""
+    while col:
+        col, remainder = divmod(col - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+class SyncMetrics:
+    """Round trip counters and phase timings of one run, plus its console output"""
+
+    def __init__(self, verbosity=NORMAL):
+        self.verbosity = verbosity
+        self.timer = PhaseTimer()
+        self.workbooks = {}  # workbook file name -> {counter: value}
+        self.sheets = {}  # workbook file name -> {sheet name: {counter: value}}
+        self.counts = {}  # anything else worth reporting about the run (facts parsed, cells written, ...)
+
+    def phase(self, name):
+        return self.timer.phase(name)
+
+    def log(self, level, message):
+        """Print message if the verbosity is at least level"""
+        if self.verbosity >= level:
+            print(message)
+
+    def count_workbook(self, workbook, counter, amount=1):
+        counters = self.workbooks.setdefault(workbook, dict.fromkeys(WORKBOOK_COUNTERS, 0))
+        counters[counter] += amount
+
+    def count_sheet(self, workbook, sheet, calls, cells, seconds, kind):
+        """Record calls range reads or writes (kind "read" or "write") of cells cells taking seconds"""
+        self.workbooks.setdefault(workbook, dict.fromkeys(WORKBOOK_COUNTERS, 0))
+        counters = self.sheets.setdefault(workbook, {}).setdefault(sheet, dict.fromkeys(SHEET_COUNTERS, 0))
+        counters[kind + "s"] += calls
+        counters["cells_" + ("read" if kind == "read" else "written")] += cells
+        counters[kind + "_seconds"] += seconds
+
+    def merge(self, summary):
+        """Add the workbook and sheet counters of another run's summary (ex: a worker process parsing a source)"""
+        for workbook, entry in summary["workbooks"].items():
+            for counter in WORKBOOK_COUNTERS:
+                self.count_workbook(workbook, counter, entry[counter])
+            for sheet, counters in entry["sheets"].items():
+                self.count_sheet(workbook, sheet, counters["reads"], counters["cells_read"], counters["read_seconds"], "read")
+                self.count_sheet(workbook, sheet, counters["writes"], counters["cells_written"],
+                                 counters["write_seconds"], "write")
+
+    def summary(self):
+        """Return everything measured as a dictionary that json.dump can write"""
+        workbooks = {}
+        for workbook, counters in self.workbooks.items():
+            sheets = self.sheets.get(workbook, {})
+            entry = dict(counters)
+            for counter in SHEET_COUNTERS:
+                entry[counter] = sum(sheet_counters[counter] for sheet_counters in sheets.values())
+            entry["sheets"] = {sheet: dict(sheet_counters) for sheet, sheet_counters in sheets.items()}
+            workbooks[workbook] = entry
+        return {"phases": dict(self.timer.totals), "total_seconds": sum(self.timer.totals.values()),
+                "workbooks": workbooks, "counts": dict(self.counts)}
+
+    def round_trip_report(self):
+        """Return the reads/writes/saves of every workbook and sheet as printable lines"""
+        lines = []
+        for workbook, entry in self.summary()["workbooks"].items():
+            lines.append(f"  {workbook}: {entry['opens']} opens, {entry['reads']} reads ({entry['cells_read']} cells, "
+                         f"{entry['read_seconds']:.2f}s), {entry['writes']} writes ({entry['cells_written']} cells, "
+                         f"{entry['write_seconds']:.2f}s), {entry['saves']} saves ({entry['save_seconds']:.2f}s)")
+            for sheet, counters in entry["sheets"].items():
+                lines.append(f"    {sheet:<20} {counters['reads']:5} reads {counters['cells_read']:8} cells   "
+                             f"{counters['writes']:5} writes {counters['cells_written']:8} cells")
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        with open(path, "w") as summary_file:
+            json.dump(self.summary(), summary_file, indent=1, default=str)
+
+
+def instrument(workbook, metrics):
+    """Given a backend workbook that was just opened, return it wrapped so every read, write and save
+    is counted in metrics"""
+    wrapped = InstrumentedWorkbook(workbook, metrics)
+    metrics.count_workbook(wrapped.label, "opens")
+    return wrapped
+
+
+class InstrumentedWorkbook:
+    """A backend workbook (see ears_backend) that reports its round trips to a SyncMetrics"""
+
+    def __init__(self, workbook, metrics):
+        self.workbook = workbook
+        self.metrics = metrics
+        self.path = workbook.path
+        self.label = os.path.basename(workbook.path)
+
+    @property
+    def sheets(self):
+        return [InstrumentedSheet(sheet, self) for sheet in self.workbook.sheets]
+
+    def sheet(self, name):
+        return InstrumentedSheet(self.workbook.sheet(name), self)
+
+    def unsaved_changes(self):
+        return self.workbook.unsaved_changes()
+
+    def save(self):
+        start = time.perf_counter()
+        with self.metrics.phase("save"):
+            self.workbook.save()
+        self.metrics.count_workbook(self.label, "saves")
+        self.metrics.count_workbook(self.label, "save_seconds", time.perf_counter() - start)
+
+    def close(self):
+        self.workbook.close()
+
+
+class InstrumentedSheet:
+    def __init__(self, sheet, workbook):
+        self.sheet = sheet
+        self.workbook = workbook
+        self.name = sheet.name
+
+    def _record(self, values, start, kind):
+        cells = sum(len(row) for row in values)
+        self.workbook.metrics.count_sheet(self.workbook.label, self.name, 1, cells, time.perf_counter() - start, kind)
+
+    def read(self, top, left, bottom, right):
+        start = time.perf_counter()
+        values = self.sheet.read(top, left, bottom, right)
+        self._record(values, start, "read")
+        return values
+
+    def write(self, top, left, values):
+        start = time.perf_counter()
+        self.sheet.write(top, left, values)
+        self._record(values, start, "write")
+        self.workbook.metrics.log(DEBUG, f"set {column_letter(left)}{top}:{column_letter(left + len(values[0]) - 1)}"
+                                         f"{top + len(values) - 1} in {self.name}")
+
+    def used_values(self):
+        start = time.perf_counter()
+        values = self.sheet.used_values()
+        self._record(values, start, "read")
+        return values
+
+    def iter_chunks(self, chunk_rows):
+        chunks = self.sheet.iter_chunks(chunk_rows)
+        while True:
+            start = time.perf_counter()
+            values = next(chunks, None)
+            if values is None:
+                return
+            self._record(values, start, "read")
+            yield values
+
+    def __repr__(self):
+        return f"<Sheet {self.name}>"
@@ -0,0 +1,648 @@
+"""One entry point for every EARS sync.
+
+Each EARS workbook is opened and indexed once, every selected source is parsed
+into attendance facts, all facts go into one write plan and the workbook is saved
+once at the end. Usage (from the folder holding the spreadsheets):
+
+    python -m pkg_sync --site MGB --sources block,clinic
+    python -m pkg_sync --site BMC --sources block,assign --backend openpyxl
+    python -m pkg_sync --site BMC -v --summary-json run.json    # with workbook round trip counts
+    python -m pkg_sync --site BMC --ears "EARs AY24 BMC.xlsm" --ears "EARs AY25 BMC.xlsm"
+    python -m pkg_sync --site MGB --verify -v    # compare the EARS workbook with the sources, write nothing
+    python -m pkg_sync --site BMC --watch        # sync again whenever a source file changes (see sync_watch)
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import timedelta
+from functools import cached_property
+
+from .ears_backend import default_backend_name, get_backend
+from .ears_calendar import CombinedCalendar, calendar_for
+from .ears_grid import DEFAULT_PRECEDENCE, FIRST_DAY_COL
+from .ears_names import FIRST_NAME_ROW, NameIndex
+from .ears_sources import (CHUNKED_PARSERS, clean_name, parse_bmc_assign, parse_bmc_block, parse_mgb_block,
+                          parse_mgb_clinic)
+from .ears_writer import WritePlan
+from .fact_export import FactExport
+from .name_resolver import ALIAS_FILE_NAME, DEFAULT_THRESHOLD, resolver_for
+from .source_reader import iter_sheet_tables, read_sheet_table
+from .source_snapshots import SnapshotCache, file_stamp, snapshot_key
+from .sync_journal import WriteJournal, unfinished_run
+from .sync_metrics import DEBUG, NORMAL, QUIET, VERBOSE, SyncMetrics, instrument
+from .sync_state import SyncState, key_source, state_key
+
+# For every site: the EARS workbook, and for every source the default file, the sheet holding the data and its parser
+SITES = {
+    "MGB": {
+        "ears": "Internal Medicine EARs AY25 MGB.xlsm",
+        "sources": {
+            "block": ("MGB IM Block SCHEDULE AY24.xlsx", 0, parse_mgb_block),
+            "clinic": ("MGB IM Clinic SCHEDULE AY24.xlsx", "VA Clinic Report", parse_mgb_clinic),
+        },
+    },
+    "BMC": {
+        "ears": "Internal Medicine EARs AY25 BMC.xlsm",
+        "sources": {
+            "block": ("Block IM Jul-Dec 2024.xlsx", 0, parse_bmc_block),
+            "assign": ("Assign Name Jul-Dec 2024.xlsx", 1, parse_bmc_assign),  # second sheet, titled "Detail"
+        },
+    },
+}
+
+
+class EarsSession:
+    """An EARS workbook with its date index, its name index and resolver, and its write plan. Nothing is
+    opened or read when the session is created: the workbook is opened and each index is built the first
+    time it is used, and then kept for the rest of the session"""
+
+    def __init__(self, backend, path, checkpoint_interval=None, use_name_cache=True, metrics=None,
+                 name_threshold=DEFAULT_THRESHOLD, journal=None, precedence=DEFAULT_PRECEDENCE):
+        self.backend = backend
+        self.path = path
+        self.checkpoint_interval = checkpoint_interval
+        self.use_name_cache = use_name_cache
+        self.metrics = metrics or SyncMetrics()
+        self.name_threshold = name_threshold
+        self.journal = journal
+        self.precedence = precedence
+
+    @cached_property
+    def workbook(self):
+        with self.metrics.phase("open"):
+            self.disk_stamp = file_stamp(self.path)
+            return instrument(self.backend.open_ears(self.path), self.metrics)
+
+    @cached_property
+    def calendar(self):
+        workbook = self.workbook
+        with self.metrics.phase("index"):
+            return calendar_for(workbook)
+
+    @cached_property
+    def names(self):
+        spans = self.calendar.spans
+        with self.metrics.phase("index"):
+            return NameIndex(self.workbook, [sheet for _, _, sheet in spans], self.use_name_cache)
+
+    @cached_property
+    def resolver(self):
+        names = self.names
+        with self.metrics.phase("index"):
+            resolver = resolver_for(names, self.name_threshold)
+        for problem in resolver.problems:
+            self.metrics.log(QUIET, problem)
+        return resolver
+
+    @cached_property
+    def plan(self):
+        return WritePlan(self.workbook, self.checkpoint_interval, self.journal, self.precedence)
+
+    def prepare(self):
+        """Open the workbook and build every index now rather than on first use
+        (run_sync does this while the sources are parsed in other processes)"""
+        for handle in ("workbook", "calendar", "names", "resolver", "plan"):
+            getattr(self, handle)
+
+    def commit(self):
+        """Write every queued mark and save the workbook once"""
+        self.plan.commit()
+        self.disk_stamp = file_stamp(self.path)
+        self.names.workbook_saved()
+        self.resolver.save()
+
+    def start_run(self, metrics):
+        """Reuse the session (its open workbook and indexes) for another run reporting to metrics: the write
+        plan starts empty again"""
+        self.metrics = metrics
+        if "workbook" in self.__dict__:
+            self.workbook.metrics = metrics
+        self.__dict__.pop("plan", None)
+
+    def changed_on_disk(self):
+        """Return True if the workbook file changed since it was opened or saved by the session (ex: edited and
+        saved in Excel), the open workbook and indexes are then out of date"""
+        return "workbook" in self.__dict__ and file_stamp(self.path) != self.disk_stamp
+
+
+class EarsRouter:
+    """One or more EARS workbooks (ex: AY24 and AY25) filled in the same pass. The date indexes of all
+    workbooks are combined, so every mark goes to the workbook and month sheet holding its date, and each
+    workbook keeps its own name index, resolver and write plan (it is still written in batches and saved once)"""
+
+    def __init__(self, sessions):
+        self.sessions = list(sessions)
+        self.missing_dates = Counter()  # date -> number of facts with no EARS sheet in any workbook
+        self.missing_names = Counter()  # trainee -> number of half days with no row on the sheet
+        self.conflicts = {}  # (EARS name, date, shift, kept value, kept source, dropped value, dropped source) -> None
+
+    @cached_property
+    def calendar(self):
+        return CombinedCalendar([(session, session.calendar) for session in self.sessions])
+
+    def prepare(self):
+        """Open every workbook and build every index now rather than on first use"""
+        for session in self.sessions:
+            session.prepare()
+        self.calendar
+
+    def apply(self, facts, source=None):
+        """Given attendance facts of a source, queue the marks of every fact in the write plan of its workbook.
+        A fact's date range is cut at the month sheet (and workbook) boundaries and each piece becomes one run
+        of day columns on the trainee's row. Facts with code None clear their half days. Half days another
+        source already marked with a different value are kept in self.conflicts. Returns the set of source rows
+        with a mark that could not be placed (no EARS name, no row on the sheet or no sheet for the date)"""
+        unplaced = set()
+        for fact in facts:
+            names = {}  # session -> EARS name, each source name is looked up once per workbook and run
+            covered_days = 0
+            for session, sheet, first, last in self.calendar.segments(fact.start, fact.end):
+                covered_days += (last - first).days + 1
+                if session not in names:
+                    names[session] = session.resolver.resolve(fact.trainee)
+                name = names[session]
+                row = session.names.row(sheet.name, name) if name is not None else None
+                if row is None:
+                    if fact.code is not None:
+                        self.missing_names[name or clean_name(fact.trainee)] += (last - first).days + 1
+                        unplaced.add(fact.source_row)
+                    continue
+                if fact.shift == "PM":
+                    row += 1
+                conflicts = session.plan.add_run(sheet, row, FIRST_DAY_COL + first.day - 1,
+                                                 FIRST_DAY_COL + last.day - 1, fact.code, source)
+                for col, *values in conflicts:
+                    day = first + timedelta(days=col - FIRST_DAY_COL - first.day + 1)
+                    self.conflicts[(name, day, fact.shift, *values)] = None
+            if covered_days <= (fact.end - fact.start).days and fact.code is not None:
+                unplaced.add(fact.source_row)
+                for offset in range((fact.end - fact.start).days + 1):
+                    day = fact.start + timedelta(days=offset)
+                    if not self.calendar.covers(day):
+                        self.missing_dates[day] += 1
+        return unplaced
+
+    def ears_name(self, source_name):
+        """Return the EARS name a source name resolves to in the first workbook that knows it, or the cleaned
+        source name"""
+        for session in self.sessions:
+            name = session.resolver.resolve(source_name)
+            if name is not None:
+                return name
+        return clean_name(source_name)
+
+    def flush(self):
+        """Write the marks left in every write plan, once every fact of the run was applied"""
+        for session in self.sessions:
+            session.plan.flush(last=True)
+
+    def commit(self):
+        """Write every queued mark and save each workbook once"""
+        for session in self.sessions:
+            session.commit()
+
+    @property
+    def marks_queued(self):
+        return sum(session.plan.marks_queued for session in self.sessions)
+
+    @property
+    def cells_written(self):
+        return sum(session.plan.cells_written for session in self.sessions)
+
+    @property
+    def cells_unchanged(self):
+        return sum(session.plan.cells_unchanged for session in self.sessions)
+
+    def name_counts(self):
+        counts = Counter()
+        for session in self.sessions:
+            counts.update(session.resolver.counts())
+        return dict(counts)
+
+    def conflict_report(self):
+        """Return a list of {"name", "kept", "kept_source", "dropped", "dropped_source", "half_days", "first", "last"},
+        one for every trainee and pair of disagreeing sources"""
+        groups = {}
+        for name, day, _, kept, kept_source, dropped, dropped_source in self.conflicts:
+            groups.setdefault((name, kept, str(kept_source), dropped, str(dropped_source)), []).append(day)
+        return [{"name": name, "kept": kept, "kept_source": kept_source, "dropped": dropped,
+                 "dropped_source": dropped_source, "half_days": len(days), "first": min(days).isoformat(),
+                 "last": max(days).isoformat()}
+                for (name, kept, kept_source, dropped, dropped_source), days in sorted(groups.items())]
+
+    def verify(self):
+        """Compare the queued marks of every workbook with its sheets instead of writing them, reading the data
+        region of each sheet once. Return a sorted list of (EARS name, date, shift, kind, expected value, sheet value)
+        for every half day that differs (see AttendanceGrid.diff for the kinds)"""
+        differences = []
+        for session in self.sessions:
+            spans = {sheet.name: (first, last) for first, last, sheet in session.calendar.spans}
+            for sheet_name, cells in session.plan.diff().items():
+                names = {row: name for name, row in session.names.sheets.get(sheet_name, {}).items()}
+                first, last = spans[sheet_name]
+                for (row, col), (kind, expected, actual) in cells.items():
+                    day = first + timedelta(days=col - FIRST_DAY_COL + 1 - first.day)
+                    if not first <= day <= last:
+                        continue  # day 31 of a shorter month
+                    am_row = row - (row - FIRST_NAME_ROW) % 2
+                    name = names.get(am_row, f"{sheet_name} row {am_row}")
+                    differences.append((name, day, "AM" if row == am_row else "PM", kind, expected, actual))
+        return sorted(differences, key=lambda difference: difference[:3])
+
+    def report(self):
+        """Return a short summary of the names suggested by similarity and of the facts that could not be placed"""
+        lines = []
+        suggested = set()
+        for session in self.sessions:
+            suggestions = session.resolver.suggestions if "resolver" in session.__dict__ else []
+            for source_name, name, similarity in suggestions:
+                if source_name not in suggested:
+                    suggested.add(source_name)
+                    lines.append(f"{source_name} not found on spreadsheet, looks like {name} ({similarity:.0%} similar): "
+                                 f"confirm it in {ALIAS_FILE_NAME} to fill it in")
+        for name, count in sorted(self.missing_names.items()):
+            if name in suggested:
+                continue
+            lines.append(f"{name} not found on spreadsheet :( ({count} half days)")
+        if self.missing_dates:
+            first, last = min(self.missing_dates), max(self.missing_dates)
+            lines.append(f"No EARS sheet for {len(self.missing_dates)} dates between {first} and {last}")
+        return "\n".join(lines)
+
+
+def ears_paths_of(ears_path):
+    """Given one EARS workbook path or a list of them, return the list"""
+    return [ears_path] if isinstance(ears_path, str) else list(ears_path)
+
+
+def parse_source(backend_name, path, sheet_name, parser, use_snapshots=True):
+    """Open a source workbook, read its data sheet (in chunks if the parser can take it that way) and return
+    (parsed facts, metrics summary of the source workbook). If a snapshot of the same file parsed the same way
+    exists (see source_snapshots) its facts are returned without opening the workbook. Either way the rows the
+    parser skipped are described in the "problems" count of the summary, for the caller to report. Runs in a
+    worker process when sources are parsed in parallel, so it only takes and returns picklable values"""
+    metrics = SyncMetrics()
+    snapshots = SnapshotCache(path) if use_snapshots else None
+    if snapshots:
+        key = snapshot_key(path, sheet_name, parser)
+        snapshot = snapshots.get(key)
+        if snapshot is not None:
+            facts, metrics.counts["problems"] = snapshot
+            metrics.counts["snapshot"] = "used"
+            return facts, metrics.summary()
+
+    backend = get_backend(backend_name)
+    source_wb = instrument(backend.open_source(path), metrics)
+    problems = metrics.counts["problems"] = []
+    try:
+        if parser in CHUNKED_PARSERS:  # row by row export: only one chunk of rows is held in memory at a time
+            facts = []
+            for chunk_facts in CHUNKED_PARSERS[parser](iter_sheet_tables(source_wb.sheet(sheet_name)), problems):
+                facts += chunk_facts
+        else:
+            facts = parser(read_sheet_table(source_wb.sheet(sheet_name)), problems)
+    finally:
+        source_wb.close()
+    if snapshots:
+        snapshots.put(key, facts, problems)
+        metrics.counts["snapshot"] = "stored"
+    return facts, metrics.summary()
+
+
+def start_parsing(site_config, sources, backend_name, source_paths, workers, use_snapshots=True):
+    """Start parsing every source and return {source: future of parse_source}. With more than one worker the
+    sources are parsed in a process pool, meanwhile the main process is free to open the EARS workbook. xlwings
+    drives the one running Excel, so it always parses in this process (the futures are then already resolved)"""
+    jobs = {}
+    for source in sources:
+        default_path, sheet_name, parser = site_config["sources"][source]
+        jobs[source] = (backend_name, source_paths.get(source, default_path), sheet_name, parser, use_snapshots)
+
+    if workers > 1 and backend_name != "xlwings" and len(jobs) > 1:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(jobs)))
+        futures = {source: pool.submit(parse_source, *job) for source, job in jobs.items()}
+        pool.shutdown(wait=False)  # the pool exits by itself once every future is done
+        return futures
+
+    futures = {}
+    for source, job in jobs.items():
+        futures[source] = Future()
+        futures[source].set_result(parse_source(*job))
+    return futures
+
+
+def run_sync(site, sources, backend_name=None, ears_path=None, source_paths=None, checkpoint_interval=None,
+             use_name_cache=True, incremental=False, workers=None, verbosity=NORMAL, summary_path=None,
+             name_threshold=DEFAULT_THRESHOLD, use_journal=True, use_snapshots=True, precedence=DEFAULT_PRECEDENCE,
+             export_path=None, sessions=None):
+    """Given a site ("MGB" or "BMC") and a list of its source names, parse every source into one write plan for the
+    site's EARS workbook and save it once. Returns the SyncMetrics of the run. ears_path may also be a list of EARS
+    workbooks (ex: AY24 and AY25): every mark then goes to the workbook covering its date, the first one listed
+    wins when two cover the same date, and each workbook is saved once. sessions may hold the EarsSessions of an
+    earlier run (see sync_watch): their open workbooks, indexes and journals are used instead of opening ears_path
+    again. source_paths may override the default file of a source ({"block": "other.xlsx"}). Sources parsed before
+    are loaded from their snapshot (see source_snapshots) unless use_snapshots is False. workers is the number of
+    processes parsing sources in parallel (default: one per CPU). Rows removed or changed since the last run on the
+    same source file are cleared; with incremental=True only added/changed/removed rows are written at all. When
+    sources mark the same half day with different values the first value of precedence wins (PTO over P by default)
+    and the half day is listed as a conflict. Source names not on the EARS sheets are only suggested (never
+    written) by similarity when it is at least name_threshold (1 turns that off). Every range is journaled before
+    it is written (see sync_journal) unless use_journal is False. The plan is also saved every checkpoint_interval
+    marks if given (see WritePlan), and the trainee names are read from the name cache (see ears_names) unless
+    use_name_cache is False. verbosity is one of the sync_metrics levels, the JSON summary of the run is written to
+    summary_path if given. With export_path every parsed fact is also written, one row per half day, to that CSV or
+    Parquet file (see fact_export)"""
+    site_config = SITES[site]
+    source_paths = source_paths or {}
+    backend_name = backend_name or default_backend_name()
+    backend = get_backend(backend_name)
+    metrics = SyncMetrics(verbosity)
+    metrics.counts.update(site=site, sources=list(sources), backend=backend_name)
+
+    export = FactExport(export_path) if export_path else None
+    if sessions:
+        for session in sessions:
+            session.start_run(metrics)
+        ears_paths = [session.path for session in sessions]
+        journals = {session.path: session.journal for session in sessions if session.journal}
+    else:
+        ears_paths = ears_paths_of(ears_path or site_config["ears"])
+        journals = {path: WriteJournal(path) for path in ears_paths} if use_journal else {}
+    for path in journals:
+        if unfinished_run(path):
+            metrics.log(NORMAL, f"The last run on {path} did not finish (use --resume to finish it), "
+                                "starting a new run instead")
+
+    source_files = {source: source_paths.get(source, site_config["sources"][source][0]) for source in sources}
+    with metrics.phase("parse"):
+        parsing = start_parsing(site_config, sources, backend_name, source_paths, workers or os.cpu_count() or 1,
+                                use_snapshots)
+    router = EarsRouter(sessions or [EarsSession(backend, path, checkpoint_interval, use_name_cache, metrics,
+                                                 name_threshold, journals.get(path), precedence) for path in ears_paths])
+    router.prepare()
+    for journal in journals.values():
+        journal.begin(site=site, sources=list(sources), backend=backend_name)
+    with metrics.phase("index"):
+        state = SyncState(ears_paths[0])  # the rows of every source, whichever workbook their marks went to
+    touched = []  # facts set or cleared by this run
+    applied = []  # state keys of the source files whose facts were all applied
+    for source in sources:
+        with metrics.phase("parse"):
+            facts, source_metrics = parsing[source].result()
+            metrics.merge(source_metrics)
+        for problem in source_metrics["counts"]["problems"]:
+            metrics.log(QUIET, f"{site} {source}: {problem}")
+        with metrics.phase("plan"):
+            key = state_key(source, source_files[source])
+            delta = state.delta(key, facts, incremental)
+            state.set_unplaced(key, router.apply(delta.sets, source))
+            router.apply(delta.clears, source)
+            touched += delta.sets + delta.clears
+            if not incremental:
+                applied.append(key)
+        if export:
+            with metrics.phase("export"):
+                export.add(site, source, facts, router.ears_name)
+        snapshot = source_metrics["counts"].get("snapshot")
+        metrics.counts[source] = {"facts": len(facts), "added": delta.added, "changed": delta.changed,
+                                  "removed": delta.removed, "unchanged": delta.unchanged, "unplaced": delta.unplaced,
+                                  "snapshot": snapshot}
+        metrics.log(NORMAL, f"{site} {source}: {len(facts)} facts {'from snapshot' if snapshot == 'used' else 'parsed'}"
+                            f", rows: {delta.added} added, {delta.changed} changed, {delta.removed} removed, "
+                            f"{delta.unchanged} unchanged, {delta.unplaced} not placed last time")
+    with metrics.phase("plan"):
+        # the other rows marking the same half days are merged in again, so precedence holds against marks
+        # already on the sheet and a clear doesn't blank a half day another row still marks
+        for key, facts in state.overlapping(touched, applied).items():
+            router.apply(facts, key_source(key))
+    with metrics.phase("flush"):
+        router.flush()
+    with metrics.phase("save"):
+        router.commit()
+        state.save()
+        for journal in journals.values():
+            journal.done()
+    if export:
+        with metrics.phase("export"):
+            export.close()
+        metrics.counts["exported_rows"] = export.rows_written
+        metrics.log(NORMAL, f"{export.rows_written} half day rows exported to {export_path}")
+
+    metrics.counts.update(ears=ears_paths, marks=router.marks_queued, cells_written=router.cells_written,
+                          cells_unchanged=router.cells_unchanged, conflicts=router.conflict_report(),
+                          missing_names=len(router.missing_names), missing_dates=len(router.missing_dates),
+                          names=router.name_counts(), precedence=list(precedence))
+    if len(ears_paths) > 1:
+        for session in router.sessions:
+            metrics.log(NORMAL, f"{session.path}: {session.plan.cells_written} cells written")
+    metrics.log(VERBOSE, f"{router.marks_queued} half day marks from the sources merged into "
+                         f"{router.cells_written + router.cells_unchanged} cells")
+    metrics.log(NORMAL, f"{router.cells_written} cells written, {router.cells_unchanged} already up to date")
+    if router.conflicts:
+        metrics.log(NORMAL, f"Sources disagree on {len(router.conflicts)} half days, kept by precedence "
+                            f"{' > '.join(precedence)} (-v lists them)")
+        for conflict in metrics.counts["conflicts"]:
+            metrics.log(VERBOSE, f"  {conflict['name']}: {conflict['dropped_source']} says {conflict['dropped']} and "
+                                 f"{conflict['kept_source']} says {conflict['kept']} on {conflict['half_days']} half days "
+                                 f"({conflict['first']} to {conflict['last']}), {conflict['kept']} kept")
+    summary = router.report()
+    if summary:
+        metrics.log(QUIET, summary)
+    metrics.log(VERBOSE, "Workbook round trips:")
+    metrics.log(VERBOSE, metrics.round_trip_report())
+    metrics.log(NORMAL, "Timing:")
+    metrics.log(NORMAL, metrics.timer.report())
+    if summary_path:
+        metrics.write_json(summary_path)
+    return metrics
+
+
+def verify_sync(site, sources, backend_name=None, ears_path=None, source_paths=None, workers=None, verbosity=NORMAL,
+                summary_path=None, name_threshold=DEFAULT_THRESHOLD, use_snapshots=True, precedence=DEFAULT_PRECEDENCE):
+    """Given the same arguments as run_sync, check the site's EARS workbook(s) against the sources without
+    writing anything: every source is parsed, its facts merged into the expected marks as a full run would,
+    and the data region of every month sheet involved is read once and compared. Prints the missing, extra and
+    conflicting marks per trainee and returns the list of differences (see EarsRouter.verify)"""
+    site_config = SITES[site]
+    backend_name = backend_name or default_backend_name()
+    backend = get_backend(backend_name)
+    metrics = SyncMetrics(verbosity)
+    metrics.counts.update(site=site, sources=list(sources), backend=backend_name, verify=True)
+
+    ears_paths = ears_paths_of(ears_path or site_config["ears"])
+    with metrics.phase("parse"):
+        parsing = start_parsing(site_config, sources, backend_name, source_paths or {},
+                                workers or os.cpu_count() or 1, use_snapshots)
+    router = EarsRouter(EarsSession(backend, path, metrics=metrics, name_threshold=name_threshold,
+                                    precedence=precedence) for path in ears_paths)
+    router.prepare()
+    for source in sources:
+        with metrics.phase("parse"):
+            facts, source_metrics = parsing[source].result()
+            metrics.merge(source_metrics)
+        for problem in source_metrics["counts"]["problems"]:
+            metrics.log(QUIET, f"{site} {source}: {problem}")
+        with metrics.phase("plan"):
+            router.apply(facts, source)
+    with metrics.phase("verify"):
+        differences = router.verify()
+
+    per_name = {}
+    for name, day, shift, kind, expected, actual in differences:
+        per_name.setdefault(name, Counter())[kind] += 1
+    metrics.counts.update(ears=ears_paths, marks=router.marks_queued, differences=len(differences),
+                          kinds=dict(Counter(difference[3] for difference in differences)),
+                          by_name={name: dict(kinds) for name, kinds in per_name.items()})
+    metrics.log(NORMAL, f"{router.marks_queued} half day marks checked, {len(differences)} differ from the sources")
+    current = None
+    for name, day, shift, kind, expected, actual in differences:
+        if name != current:
+            current = name
+            metrics.log(QUIET, f"{name}: " + ", ".join(f"{count} {kind}" for kind, count in sorted(per_name[name].items())))
+        if kind == "missing":
+            metrics.log(VERBOSE, f"  {day} {shift}: {expected} missing")
+        elif kind == "extra":
+            metrics.log(VERBOSE, f"  {day} {shift}: {actual} on the sheet, no source marks it")
+        else:
+            metrics.log(VERBOSE, f"  {day} {shift}: {expected} expected, the sheet has {actual}")
+    summary = router.report()
+    if summary:
+        metrics.log(QUIET, summary)
+    metrics.log(NORMAL, "Timing:")
+    metrics.log(NORMAL, metrics.timer.report())
+    if summary_path:
+        metrics.write_json(summary_path)
+    return differences
+
+
+def resume_sync(site, backend_name=None, ears_path=None, verbosity=NORMAL):
+    """Finish the last run on a site's EARS workbook (or on each of a list of them) that did not finish: the
+    ranges its journal holds that were not saved yet are written again and the workbook is saved. Returns False
+    if a run died before its whole plan was journaled (the sync has to run again to write the rest), else True"""
+    metrics = SyncMetrics(verbosity)
+    cells = 0
+    finished = True
+    for path in ears_paths_of(ears_path or SITES[site]["ears"]):
+        pending = unfinished_run(path)
+        if pending is None:
+            metrics.log(QUIET, f"Nothing to resume for {path}")
+            continue
+        begin, committed, uncommitted, complete = pending
+        metrics.log(NORMAL, f"Resuming the {begin.get('site')} {', '.join(begin.get('sources', []))} run of "
+                            f"{begin['run']} on {path}: {len(committed)} ranges were saved, "
+                            f"{len(uncommitted)} to write again")
+
+        backend = get_backend(backend_name or begin.get("backend") or default_backend_name())
+        with metrics.phase("open"):
+            workbook = instrument(backend.open_ears(path), metrics)
+        journal = WriteJournal(path)
+        journal.run = begin["run"]
+        with metrics.phase("flush"):
+            for record in uncommitted:
+                workbook.sheet(record["sheet"]).write(record["row"], record["col"], record["values"])
+                cells += sum(len(row) for row in record["values"])
+        with metrics.phase("save"):
+            workbook.save()
+        journal.saved()
+        journal.done()
+        if not complete:
+            finished = False
+            metrics.log(QUIET, f"The run stopped before all its changes to {path} were noted in the journal, "
+                               "only part of them could be written: run the sync again (without --resume)")
+    if metrics.timer.totals:
+        metrics.log(NORMAL, f"{cells} cells written. Run the sync again to pick up changes made since then")
+        metrics.log(NORMAL, "Timing:")
+        metrics.log(NORMAL, metrics.timer.report())
+    return finished
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pkg_sync",
+                                     description="Fill an EARS workbook from the schedule exports of one site.")
+    parser.add_argument("--site", required=True, choices=sorted(SITES))
+    parser.add_argument("--sources", help="comma separated source names (default: every source of the site)")
+    parser.add_argument("--backend", choices=["xlwings", "openpyxl"], help="default: $PKG_SYNC_BACKEND or xlwings")
+    parser.add_argument("--ears", action="append",
+                        help="path of the EARS workbook (default: the site's usual file). Repeat it to fill several "
+                             "academic years in one run, ex: --ears \"...AY24 BMC.xlsm\" --ears \"...AY25 BMC.xlsm\"")
+    parser.add_argument("--source", action="append", default=[], metavar="NAME=PATH",
+                        help="use another file for a source, ex: --source block=\"Block IM Jan-Jun 2025.xlsx\"")
+    parser.add_argument("--save-every", type=int, help="also save the EARS workbook after this many marks")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only write the rows that were added, changed or removed since the last run")
+    parser.add_argument("--workers", type=int, help="processes parsing sources in parallel (default: one per CPU, "
+                                                    "1 parses one source after the other)")
+    parser.add_argument("--rescan-names", action="store_true",
+                        help="ignore the cached name rows and read them from the EARS workbook again")
+    parser.add_argument("--resume", action="store_true",
+                        help="finish the last run on the EARS workbook that crashed or hung halfway, then stop")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running: sync again (incrementally) every time a source file changes")
+    parser.add_argument("--poll", type=float, default=2, metavar="SECONDS",
+                        help="with --watch, how often the source files are checked (default 2)")
+    parser.add_argument("--debounce", type=float, default=5, metavar="SECONDS",
+                        help="with --watch, how long a changed file must be left alone before it is read (default 5)")
+    parser.add_argument("--verify", action="store_true",
+                        help="don't write anything, list the marks the EARS workbook is missing, has in excess or "
+                             "holds differently from the sources (exit status 1 if there are any), then stop")
+    parser.add_argument("--no-journal", action="store_true",
+                        help="don't journal the writes (a crashed run then can't be resumed)")
+    parser.add_argument("--no-snapshots", action="store_true",
+                        help="parse every source workbook again instead of using the facts saved by an earlier run")
+    parser.add_argument("--name-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"similarity (0-1) a misspelled name needs to be suggested, 1 turns this off "
+                             f"(default {DEFAULT_THRESHOLD})")
+    parser.add_argument("--export-facts", metavar="PATH",
+                        help="also write every parsed half day to this .csv or .parquet file (parquet needs pyarrow)")
+    parser.add_argument("--precedence", default=",".join(DEFAULT_PRECEDENCE), metavar="CODES",
+                        help="which value wins when sources disagree on a half day, highest first "
+                             f"(default {','.join(DEFAULT_PRECEDENCE)})")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="-v also prints the workbook reads/writes per sheet, -vv every range written")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print names and dates that were not found")
+    parser.add_argument("--summary-json", help="write the counters and timings of the run to this JSON file")
+    args = parser.parse_args(argv)
+
+    verbosity = QUIET if args.quiet else min(NORMAL + args.verbose, DEBUG)
+    if args.resume:
+        sys.exit(0 if resume_sync(args.site, args.backend, args.ears, verbosity) else 1)
+
+    site_sources = SITES[args.site]["sources"]
+    sources = args.sources.split(",") if args.sources else list(site_sources)
+    for source in sources:
+        if source not in site_sources:
+            parser.error(f"{args.site} has no source named {source!r} (choose from {', '.join(site_sources)})")
+    source_paths = dict(item.split("=", 1) for item in args.source)
+    precedence = tuple(code.strip() for code in args.precedence.split(","))
+    if sorted(precedence) != sorted(DEFAULT_PRECEDENCE):
+        parser.error(f"--precedence must list each of {', '.join(DEFAULT_PRECEDENCE)} once")
+    if args.verify:
+        differences = verify_sync(args.site, sources, backend_name=args.backend, ears_path=args.ears,
+                                  source_paths=source_paths, workers=args.workers, verbosity=verbosity,
+                                  summary_path=args.summary_json, name_threshold=args.name_threshold,
+                                  use_snapshots=not args.no_snapshots, precedence=precedence)
+        sys.exit(1 if differences else 0)
+    if args.watch:
+        if args.export_facts and args.no_snapshots:
+            parser.error("--watch rebuilds the --export-facts file from every source on each run, "
+                         "which needs the snapshots (drop --no-snapshots)")
+        from .sync_watch import watch_sync  # sync_watch builds on this module
+        watch_sync(args.site, sources, backend_name=args.backend, ears_path=args.ears, source_paths=source_paths,
+                   poll=args.poll, debounce=args.debounce, checkpoint_interval=args.save_every,
+                   use_name_cache=not args.rescan_names, workers=args.workers, verbosity=verbosity,
+                   summary_path=args.summary_json, name_threshold=args.name_threshold,
+                   use_journal=not args.no_journal, use_snapshots=not args.no_snapshots, precedence=precedence,
+                   export_path=args.export_facts)
+        return
+    run_sync(args.site, sources, backend_name=args.backend, ears_path=args.ears, source_paths=source_paths,
+             checkpoint_interval=args.save_every, use_name_cache=not args.rescan_names, incremental=args.incremental,
+             workers=args.workers, verbosity=verbosity, summary_path=args.summary_json,
+             name_threshold=args.name_threshold, use_journal=not args.no_journal,
+             use_snapshots=not args.no_snapshots, precedence=precedence, export_path=args.export_facts)
+
+
+if __name__ == "__main__":
+    main()
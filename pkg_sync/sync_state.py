@@ -0,0 +1,164 @@
+"""Source row fingerprints for incremental syncs.
+
+After every run the facts of each source row are stored in a small JSON state file
+next to the EARS workbook, together with a fingerprint of those facts. The next run
+compares the freshly parsed rows against it:
+
+    added row       -> set its facts
+    changed row     -> clear the old facts, set the new ones
+    removed row     -> clear the old facts (cancelled or moved shifts don't stay behind)
+    unchanged row   -> nothing to do (skipped entirely in incremental mode)
+    unplaced row    -> set its facts again: some of them found no row or no sheet last time
+                       (ex: a name only suggested then, confirmed in the alias file since)
+
+A clear never blanks a half day another current row still marks, and a set never
+replaces the mark of a current row of higher precedence, see overlapping.
+Rows are kept per source file (see state_key): running a source on another file (the
+Jan-Jun export after the Jul-Dec one) adds that file's rows, it doesn't remove the others.
+"""
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+from datetime import date
+
+from .ears_sources import AttendanceFact
+
+STATE_FILE_NAME = ".ears_sync_state.json"
+
+SyncDelta = namedtuple("SyncDelta", ["sets", "clears", "added", "changed", "removed", "unchanged", "unplaced"])
+
+
+def state_key(source, path):
+    """Return the key the rows of a source file are kept under, ex: block|C:/.../Block IM Jul-Dec 2024.xlsx"""
+    return f"{source}|{os.path.abspath(path)}"
+
+
+def key_source(key):
+    """Given a state_key, return the source name"""
+    return key.split("|", 1)[0]
+
+
+def group_by_row(facts):
+    """Given facts, return {source_row: [facts]}"""
+    rows = {}
+    for fact in facts:
+        rows.setdefault(fact.source_row, []).append(fact)
+    return rows
+
+
+def encode_fact(fact):
+    return [fact.trainee, fact.start.isoformat(), fact.end.isoformat(), fact.shift, fact.code]
+
+
+def decode_fact(values, source_row):
+    trainee, start, end, shift, code = values
+    return AttendanceFact(trainee, date.fromisoformat(start), date.fromisoformat(end), shift, code, source_row)
+
+
+def fingerprint(facts):
+    """Return a short hash of what a source row says (the order of its facts does not matter)"""
+    encoded = json.dumps(sorted(encode_fact(fact) for fact in facts))
+    return hashlib.sha1(encoded.encode()).hexdigest()[:16]
+
+
+def as_clear(fact):
+    """Return the fact turned into a clear of the same half days"""
+    return fact._replace(code=None)
+
+
+class SyncState:
+    """Fingerprints and facts of every source row of one EARS workbook, as of the last successful run"""
+
+    def __init__(self, ears_path):
+        self.ears_path = os.path.abspath(ears_path)
+        self.state_path = os.path.join(os.path.dirname(self.ears_path), STATE_FILE_NAME)
+        self.all_entries = {}
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as state_file:
+                self.all_entries = json.load(state_file)
+        self.sources = self.all_entries.setdefault(self.ears_path, {})  # state_key -> {row: {"fingerprint", "facts"}}
+        for key in [key for key in self.sources if "|" not in key]:
+            # kept per source name only by older versions: the file those rows came from is unknown, so they are
+            # dropped rather than cleared (the next run sets every current row again)
+            del self.sources[key]
+
+    def delta(self, source, facts, incremental=True):
+        """Given the state_key of a source file and its freshly parsed facts, record them as the new state of
+        the file and return a SyncDelta. When incremental is False every fact is set, not only those of
+        added/changed rows (and of the rows that could not all be placed last time, see set_unplaced)"""
+        old_rows = self.sources.get(source, {})
+        new_rows = {}
+        sets, clears = [], []
+        added = changed = unchanged = unplaced = 0
+        for source_row, row_facts in group_by_row(facts).items():
+            row_fingerprint = fingerprint(row_facts)
+            new_rows[source_row] = {"fingerprint": row_fingerprint, "facts": [encode_fact(fact) for fact in row_facts]}
+            old = old_rows.get(source_row)
+            if old is None:
+                added += 1
+                sets += row_facts
+            elif old["fingerprint"] != row_fingerprint:
+                changed += 1
+                sets += row_facts
+                clears += [as_clear(decode_fact(values, source_row)) for values in old["facts"]]
+            elif old.get("unplaced"):
+                unplaced += 1
+                sets += row_facts
+            else:
+                unchanged += 1
+                if not incremental:
+                    sets += row_facts
+        removed = 0
+        for source_row, old in old_rows.items():
+            if source_row not in new_rows:
+                removed += 1
+                clears += [as_clear(decode_fact(values, source_row)) for values in old["facts"]]
+        self.sources[source] = new_rows
+        return SyncDelta(sets, clears, added, changed, removed, unchanged, unplaced)
+
+    def set_unplaced(self, source, source_rows):
+        """Given the state_key of a source file and the rows of it whose facts could not all be placed this run
+        (see EarsRouter.apply), flag them so the next run sets them again, incremental or not"""
+        rows = self.sources.get(source, {})
+        for source_row in source_rows:
+            if source_row in rows:
+                rows[source_row]["unplaced"] = True
+
+    def current_facts(self):
+        """Return {state_key: facts} for every fact of the current state"""
+        facts = {}
+        for source, rows in self.sources.items():
+            facts[source] = []
+            for source_row, row in rows.items():
+                facts[source] += [decode_fact(values, source_row) for values in row["facts"]]
+        return facts
+
+    def overlapping(self, facts, skip=()):
+        """Given the facts a run sets or clears, return {state_key: current facts overlapping them} (except those
+        of the source files in skip, already applied in full), so they can be applied again: a half day another
+        row still marks must keep its mark even though one row let go of it, and a new mark must be merged with
+        the marks of other rows (ex: a new block P doesn't replace an assign PTO already on the sheet)"""
+        if not facts:
+            return {}
+        ranges = {}
+        for fact in facts:
+            ranges.setdefault((fact.trainee, fact.shift), []).append((fact.start, fact.end))
+        overlapping = {}
+        for key, current in self.current_facts().items():
+            if key in skip:
+                continue
+            for fact in current:
+                for start, end in ranges.get((fact.trainee, fact.shift), []):
+                    if fact.start <= end and start <= fact.end:
+                        overlapping.setdefault(key, []).append(fact)
+                        break
+        return overlapping
+
+    def save(self):
+        """Write the state file (call only once the EARS workbook was saved)"""
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w") as state_file:
+            json.dump(self.all_entries, state_file)
+        os.replace(temp_path, self.state_path)
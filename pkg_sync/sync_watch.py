@@ -0,0 +1,135 @@
+"""Watch mode: keep a site's EARS workbook(s) up to date as schedule exports are dropped in.
+
+    python -m pkg_sync --site BMC --watch
+    python -m pkg_sync --site MGB --watch --poll 10 --debounce 30
+
+The source files of the site are polled every few seconds (a stat per file, which works
+the same on Windows, network shares and Linux). A file that changed is left alone until
+it stopped changing for the debounce time, so a copy or a save in progress is never
+read halfway, then its content hash decides whether it really changed. Only the sources
+whose content changed are parsed again, and the run is incremental: only their added,
+changed or removed rows are written. With an export file every run covers all the
+sources, so the export is rebuilt whole: the unchanged ones are loaded from their
+snapshots and have no rows to write.
+
+The EARS workbooks stay open between runs with their date and name indexes built, so a
+run after the first one only parses and writes. A workbook that changed on disk since
+the last run (ex: edited and saved in Excel) is opened and indexed again first.
+"""
+
+import time
+
+from .ears_backend import default_backend_name, get_backend
+from .ears_grid import DEFAULT_PRECEDENCE
+from .name_resolver import DEFAULT_THRESHOLD
+from .source_snapshots import file_digest, file_stamp
+from .sync_journal import WriteJournal
+from .sync_metrics import NORMAL, QUIET, SyncMetrics
+from .sync_pipeline import SITES, EarsSession, ears_paths_of, run_sync
+
+POLL_SECONDS = 2
+DEBOUNCE_SECONDS = 5
+
+
+class SourceWatcher:
+    """Polls source files and reports the sources whose content changed, once the file stopped changing"""
+
+    def __init__(self, paths, debounce=DEBOUNCE_SECONDS):
+        """Given {source: file path}, remember the current state of every file"""
+        self.paths = paths
+        self.debounce = debounce
+        self.stamps = {source: file_stamp(path) for source, path in paths.items()}
+        self.digests = {source: self.digest(source) for source in paths}
+        self.changed_at = {}  # source -> time its file was last seen changing
+
+    def digest(self, source):
+        try:
+            return file_digest(self.paths[source])
+        except OSError:
+            return None  # missing, or still locked by the program writing it
+
+    def poll(self):
+        """Look at every file once and return the sources whose content changed and that were left alone for
+        the debounce time since (a file touched without any change in content is not reported)"""
+        now = time.monotonic()
+        for source, path in self.paths.items():
+            stamp = file_stamp(path)
+            if stamp != self.stamps[source]:
+                self.stamps[source] = stamp
+                self.changed_at[source] = now
+        changed = []
+        for source, changed_at in list(self.changed_at.items()):
+            if now - changed_at < self.debounce or self.stamps[source] is None:
+                continue
+            digest = self.digest(source)
+            if digest is None:
+                continue  # try again on the next poll
+            del self.changed_at[source]
+            if digest != self.digests[source]:
+                self.digests[source] = digest
+                changed.append(source)
+        return changed
+
+
+def open_sessions(backend_name, ears_paths, checkpoint_interval=None, use_name_cache=True,
+                  name_threshold=DEFAULT_THRESHOLD, use_journal=True, precedence=DEFAULT_PRECEDENCE):
+    """Return an EarsSession (with its own journal) for every EARS workbook, nothing is opened yet"""
+    backend = get_backend(backend_name)
+    return [EarsSession(backend, path, checkpoint_interval, use_name_cache, None, name_threshold,
+                        WriteJournal(path) if use_journal else None, precedence) for path in ears_paths]
+
+
+def watch_sync(site, sources, backend_name=None, ears_path=None, source_paths=None, poll=POLL_SECONDS,
+               debounce=DEBOUNCE_SECONDS, checkpoint_interval=None, use_name_cache=True, workers=None,
+               verbosity=NORMAL, summary_path=None, name_threshold=DEFAULT_THRESHOLD, use_journal=True,
+               use_snapshots=True, precedence=DEFAULT_PRECEDENCE, export_path=None, max_runs=None):
+    """Given the same arguments as run_sync, sync the site once (incrementally), then watch the files of its
+    sources and sync again every time some of them changed, until interrupted (Ctrl+C) or after max_runs runs.
+    Runs that fail (ex: the EARS workbook is locked) are tried again after the debounce time. With export_path
+    every run syncs all the sources so the export holds all of them, which is only cheap with use_snapshots.
+    Returns the number of runs"""
+    site_config = SITES[site]
+    source_paths = source_paths or {}
+    backend_name = backend_name or default_backend_name()
+    ears_paths = ears_paths_of(ears_path or site_config["ears"])
+    paths = {source: source_paths.get(source, site_config["sources"][source][0]) for source in sources}
+    watcher = SourceWatcher(paths, debounce)
+    metrics = SyncMetrics(verbosity)
+
+    sessions = None
+    pending = list(sources)  # the first run catches up with every source
+    runs = 0
+    metrics.log(NORMAL, f"Watching {', '.join(paths.values())} (Ctrl+C to stop)")
+    try:
+        while max_runs is None or runs < max_runs:
+            pending += [source for source in watcher.poll() if source not in pending]
+            if not pending:
+                time.sleep(poll)
+                continue
+            if sessions and any(session.changed_on_disk() for session in sessions):
+                metrics.log(NORMAL, "An EARS workbook changed outside of the sync, opening it again")
+                sessions = None
+            if sessions is None:
+                sessions = open_sessions(backend_name, ears_paths, checkpoint_interval=checkpoint_interval,
+                                         use_name_cache=use_name_cache, name_threshold=name_threshold,
+                                         use_journal=use_journal, precedence=precedence)
+            changed = [source for source in sources if source in pending]
+            run_sources = list(sources) if export_path else changed  # the export is written from every source
+            metrics.log(NORMAL, f"{time.strftime('%H:%M:%S')} syncing {site} {', '.join(changed)}")
+            try:
+                run_sync(site, run_sources, backend_name=backend_name, source_paths=source_paths,
+                         checkpoint_interval=checkpoint_interval, use_name_cache=use_name_cache, incremental=True,
+                         workers=workers, verbosity=verbosity, summary_path=summary_path,
+                         name_threshold=name_threshold, use_journal=use_journal, use_snapshots=use_snapshots,
+                         precedence=precedence, export_path=export_path, sessions=sessions)
+            except Exception as error:  # a file still being written, a workbook open elsewhere...
+                metrics.log(QUIET, f"The sync of {', '.join(changed)} failed ({error!r}), "
+                                   f"trying again in {debounce} seconds")
+                sessions = None  # the workbook may hold half of the run, start from the file again
+                time.sleep(debounce)
+                continue
+            pending = []
+            runs += 1
+    except KeyboardInterrupt:
+        metrics.log(NORMAL, "Stopped watching")
+    return runs
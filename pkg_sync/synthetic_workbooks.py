@@ -0,0 +1,202 @@
+"""Synthetic EARS and source workbooks for benchmarks and dry runs.
+
+Real workbooks hold PHI, so this builds look-alikes with the same layout and made
+up names, at any scale:
+
+    EARS          the 5 irrelevant sheets, then one sheet per month of the academic year
+                  (C8 month name, C9 year, G4 last date, names from B13 in two row pairs,
+                  days from column I)
+    MGB block     date-range header bands at B3 and C12 ("7/1 - 7/14"), names under each header
+    MGB clinic    "VA Clinic Report": dates on row 1, an AM and a PM row per trainee
+    BMC block     one block per row: last, first, rotation (col 6), start (col 9), end (col 10)
+    BMC assign    "Detail" sheet: last, first, rotation, hours (col 11), projected/actual
+                  start and end (cols 14-17)
+
+Usage: python -m pkg_sync.synthetic_workbooks OUTPUT_FOLDER [--trainees 150] [--year 2024]
+                                               [--clinic-days 60] [--assign-density 0.8]
+The files get the names sync_pipeline expects, so the pipeline runs in that folder as is.
+"""
+
+import argparse
+import calendar
+import os
+import random
+from datetime import date, datetime, timedelta
+
+from .ears_calendar import IRRELEVANT_SHEETS, MONTH_NUM
+from .ears_names import FIRST_NAME_ROW, LAST_NAME_ROW
+
+MONTH_NAMES = {number: name for name, number in MONTH_NUM.items()}
+ROTATIONS = ["Wards", "ICU", "Night Float", "Ambulatory", "Consults", "Vacation"]
+MGB_BLOCK_NAMES_PER_HEADER = 7  # rows 4-10 under the first band, row 11 stays blank above the second band
+
+
+def trainee_names(count, seed=0):
+    """Return count made up "Last, First" names"""
+    rng = random.Random(seed)
+    names = []
+    for i in range(count):
+        names.append(f"Trainee{i:04d}, {rng.choice(['Alex', 'Sam', 'Jordan', 'Taylor', 'Casey', 'Riley'])}")
+    return names
+
+
+def academic_months(year):
+    """Return the (year, month) pairs of the academic year starting in July of year"""
+    return [(year, month) for month in range(7, 13)] + [(year + 1, month) for month in range(1, 7)]
+
+
+def _workbook():
+    import openpyxl  # pip install openpyxl
+
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    return workbook
+
+
+def make_ears_workbook(path, names, year):
+    """Write an EARS workbook for the academic year starting in July of year, listing names on every month sheet"""
+    if len(names) > (LAST_NAME_ROW - FIRST_NAME_ROW) // 2 + 1:
+        raise ValueError("more trainees than rows on an EARS sheet")
+    workbook = _workbook()
+    for sheet_name in IRRELEVANT_SHEETS:
+        workbook.create_sheet(sheet_name)
+    for sheet_year, month in academic_months(year):
+        sheet = workbook.create_sheet(f"EAR_{MONTH_NAMES[month][:3]}_{sheet_year % 100:02d}")
+        sheet["C8"] = MONTH_NAMES[month]
+        sheet["C9"] = sheet_year
+        sheet["G4"] = datetime(sheet_year, month, calendar.monthrange(sheet_year, month)[1])
+        for i, name in enumerate(names):
+            sheet.cell(FIRST_NAME_ROW + 2 * i, 2, name)
+    workbook.save(path)
+
+
+def two_week_blocks(start, end):
+    """Return (first day, last day) pairs of consecutive 14 day blocks from start up to end"""
+    blocks = []
+    while start <= end:
+        blocks.append((start, min(start + timedelta(days=13), end)))
+        start += timedelta(days=14)
+    return blocks
+
+
+def make_mgb_block(path, names, year, seed=0):
+    """Write an MGB block schedule: July-December headers from B3, January-June headers from C12"""
+    rng = random.Random(seed)
+    workbook = _workbook()
+    sheet = workbook.create_sheet(f"AY{year % 100:02d}")
+    bands = [((3, 2), two_week_blocks(date(year, 7, 1), date(year, 12, 31))),
+             ((12, 3), two_week_blocks(date(year + 1, 1, 1), date(year + 1, 6, 30)))]
+    for (header_row, first_col), blocks in bands:
+        for offset, (first, last) in enumerate(blocks):
+            sheet.cell(header_row, first_col + offset, f"{first.month}/{first.day} - {last.month}/{last.day}")
+            for i, name in enumerate(rng.sample(names, min(MGB_BLOCK_NAMES_PER_HEADER, len(names)))):
+                sheet.cell(header_row + 1 + i, first_col + offset, name)
+    workbook.save(path)
+
+
+def make_mgb_clinic(path, names, start, days, density=0.2, seed=0):
+    """Write a VA Clinic Report covering days days from start, each half day booked with probability density"""
+    rng = random.Random(seed)
+    workbook = _workbook()
+    sheet = workbook.create_sheet("VA Clinic Report")
+    for offset in range(days):
+        sheet.cell(1, 2 + offset, datetime.combine(start + timedelta(days=offset), datetime.min.time()))
+    for i, name in enumerate(names):
+        sheet.cell(2 + 2 * i, 1, f"{name} (PGY{rng.randint(1, 3)})")
+        for shift_row in (2 + 2 * i, 3 + 2 * i):
+            for offset in range(days):
+                if rng.random() < density:
+                    sheet.cell(shift_row, 2 + offset, "VA Clinic")
+    workbook.save(path)
+
+
+def make_bmc_block(path, names, start, end, seed=0):
+    """Write a BMC block export: every trainee gets back to back two week blocks from start to end"""
+    rng = random.Random(seed)
+    workbook = _workbook()
+    sheet = workbook.create_sheet("Block")
+    row = 2
+    for name in names:
+        last_name, first_name = name.split(", ")
+        for first, last in two_week_blocks(start, end):
+            sheet.cell(row, 1, last_name)
+            sheet.cell(row, 2, first_name)
+            sheet.cell(row, 6, rng.choice(ROTATIONS))
+            sheet.cell(row, 9, datetime.combine(first, datetime.min.time()))
+            sheet.cell(row, 10, datetime.combine(last, datetime.min.time()))
+            row += 1
+    workbook.save(path)
+
+
+def make_bmc_assign(path, names, start, days, density=0.8, seed=0):
+    """Write a BMC assign export ("Detail" is the second sheet) where each trainee works a shift on each day
+    with probability density: day shifts, half day clinics and overnight shifts, some starting late"""
+    rng = random.Random(seed)
+    workbook = _workbook()
+    workbook.create_sheet("Summary")
+    sheet = workbook.create_sheet("Detail")
+    shift_types = [(7, 12), (7, 4), (13, 4), (19, 12), (7, 24), (8, 8)]  # (start hour, hours)
+    row = 2
+    for offset in range(days):
+        day = datetime.combine(start + timedelta(days=offset), datetime.min.time())
+        for name in names:
+            if rng.random() >= density:
+                continue
+            last_name, first_name = name.split(", ")
+            start_hour, hours = rng.choice(shift_types)
+            projected_start = day + timedelta(hours=start_hour)
+            projected_end = projected_start + timedelta(hours=hours)
+            sheet.cell(row, 1, last_name)
+            sheet.cell(row, 2, first_name)
+            sheet.cell(row, 6, rng.choice(ROTATIONS))
+            sheet.cell(row, 11, 0 if rng.random() < 0.02 else hours)  # a few cancelled shifts
+            sheet.cell(row, 14, projected_start)
+            sheet.cell(row, 16, projected_end)
+            if rng.random() < 0.1:  # shift started late
+                sheet.cell(row, 15, projected_start + timedelta(hours=1))
+            row += 1
+    workbook.save(path)
+
+
+def make_all(folder, trainees=150, year=2024, seed=0, clinic_days=60, assign_density=0.8):
+    """Write the EARS workbooks of both sites and all four sources into folder, under the file names
+    sync_pipeline uses by default. Returns {name: path}"""
+    from .sync_pipeline import SITES
+
+    os.makedirs(folder, exist_ok=True)
+    names = trainee_names(trainees, seed)
+    first_day, last_day = date(year, 7, 1), date(year, 12, 31)  # the sources cover Jul-Dec, like the real exports
+    paths = {
+        "MGB ears": os.path.join(folder, SITES["MGB"]["ears"]),
+        "BMC ears": os.path.join(folder, SITES["BMC"]["ears"]),
+        "MGB block": os.path.join(folder, SITES["MGB"]["sources"]["block"][0]),
+        "MGB clinic": os.path.join(folder, SITES["MGB"]["sources"]["clinic"][0]),
+        "BMC block": os.path.join(folder, SITES["BMC"]["sources"]["block"][0]),
+        "BMC assign": os.path.join(folder, SITES["BMC"]["sources"]["assign"][0]),
+    }
+    make_ears_workbook(paths["MGB ears"], names, year)
+    make_ears_workbook(paths["BMC ears"], names, year)
+    make_mgb_block(paths["MGB block"], names, year, seed)
+    make_mgb_clinic(paths["MGB clinic"], names, first_day, clinic_days, seed=seed)
+    make_bmc_block(paths["BMC block"], names, first_day, last_day, seed)
+    make_bmc_assign(paths["BMC assign"], names, first_day, (last_day - first_day).days + 1, assign_density, seed)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic EARS and source workbooks (no real names).")
+    parser.add_argument("folder")
+    parser.add_argument("--trainees", type=int, default=150)
+    parser.add_argument("--year", type=int, default=2024, help="academic year starting in July of this year")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--clinic-days", type=int, default=60, help="days covered by the VA Clinic Report")
+    parser.add_argument("--assign-density", type=float, default=0.8,
+                        help="chance that a trainee works an assign shift on a given day")
+    args = parser.parse_args(argv)
+    paths = make_all(args.folder, args.trainees, args.year, args.seed, args.clinic_days, args.assign_density)
+    for name, path in paths.items():
+        print(f"{name:<11} {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Tests of the BMC assign parser and of the shift -> half day slot mapper"""
+
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from pkg_sync.ears_sources import AttendanceFact, map_shift_slots, parse_bmc_assign
+from pkg_sync.source_reader import SourceTable
+
+
+@pytest.mark.parametrize("start, end, half_days", [
+    ("2024-07-08T08:00", "2024-07-08T12:00", [(date(2024, 7, 8), "AM")]),
+    ("2024-07-08T13:00", "2024-07-08T17:00", [(date(2024, 7, 8), "PM")]),
+    ("2024-07-08T07:00", "2024-07-08T19:00", [(date(2024, 7, 8), "AM"), (date(2024, 7, 8), "PM")]),
+    ("2024-07-08T07:00", "2024-07-08T14:00", [(date(2024, 7, 8), "AM")]),  # 2 hours of PM is not enough
+    ("2024-07-08T07:00", "2024-07-08T15:00", [(date(2024, 7, 8), "AM"), (date(2024, 7, 8), "PM")]),
+    ("2024-07-08T22:00", "2024-07-09T02:00", [(date(2024, 7, 8), "PM")]),  # night ending early
+    ("2024-07-31T20:00", "2024-08-01T08:00", [(date(2024, 7, 31), "PM"), (date(2024, 8, 1), "AM")]),
+    ("2024-12-31T07:00", "2025-01-01T12:00", [(date(2024, 12, 31), "AM"), (date(2024, 12, 31), "PM"),
+                                              (date(2025, 1, 1), "AM")]),
+])
+def test_map_shift_slots(start, end, half_days):
+    rows, dates, shifts = map_shift_slots(np.array([start], dtype="datetime64[m]"),
+                                          np.array([end], dtype="datetime64[m]"))
+    assert rows.tolist() == [0] * len(half_days)
+    assert list(zip(dates, shifts.tolist())) == half_days
+
+
+def test_map_shift_slots_several_shifts():
+    starts = np.array(["2024-07-08T08:00", "2024-07-09T20:00", "2024-07-10T08:00"], dtype="datetime64[m]")
+    ends = np.array(["2024-07-08T12:00", "2024-07-10T08:00", "2024-07-10T18:00"], dtype="datetime64[m]")
+    rows, dates, shifts = map_shift_slots(starts, ends)
+    assert list(zip(rows.tolist(), dates, shifts.tolist())) == [
+        (0, date(2024, 7, 8), "AM"), (1, date(2024, 7, 9), "PM"), (1, date(2024, 7, 10), "AM"),
+        (2, date(2024, 7, 10), "AM"), (2, date(2024, 7, 10), "PM")]
+    empty = np.array([], dtype="datetime64[m]")
+    assert [len(values) for values in map_shift_slots(empty, empty)] == [0, 0, 0]
+
+
+def assign_table(*shifts):
+    """Given (last, first, rotation, hours, projected start, actual start, projected end, actual end) tuples,
+    return a Detail sheet holding them from row 2"""
+    rows = [["Last", "First"]]
+    for last, first, rotation, hours, *times in shifts:
+        row = [None] * 17
+        row[0], row[1], row[5], row[10] = last, first, rotation, hours
+        row[13:17] = times
+        rows.append(row)
+    return SourceTable(rows, "Detail")
+
+
+def test_bmc_assign():
+    problems = []
+    facts = parse_bmc_assign(assign_table(
+        ("Smith", "Anna", "Clinic", 4, datetime(2024, 7, 8, 8), None, datetime(2024, 7, 8, 12), None),
+        ("Jones", "Bob", "Vacation", 12, datetime(2024, 7, 31, 19), None, None, None),  # no end: 12 hours
+        ("Lee", "Carol", "Wards", 8, datetime(2024, 8, 2, 8), datetime(2024, 8, 2, 13), datetime(2024, 8, 2, 16), None),
+        ("Nguyen", "Dan", "Day", 0, datetime(2024, 8, 3, 8), None, datetime(2024, 8, 3, 16), None),  # cancelled
+        ("Kim", "Jina", "Day", 8, datetime(2024, 8, 4, 8), None, datetime(2024, 8, 4, 8), None),  # 0 hours long
+    ), problems)
+    assert facts == [
+        AttendanceFact("Smith, Anna", date(2024, 7, 8), date(2024, 7, 8), "AM", "P", "Smith, Anna|2024-07-08 08:00:00"),
+        AttendanceFact("Jones, Bob", date(2024, 7, 31), date(2024, 7, 31), "PM", "PTO", "Jones, Bob|2024-07-31 19:00:00"),
+        AttendanceFact("Jones, Bob", date(2024, 8, 1), date(2024, 8, 1), "AM", "PTO", "Jones, Bob|2024-07-31 19:00:00"),
+        AttendanceFact("Lee, Carol", date(2024, 8, 2), date(2024, 8, 2), "PM", "P", "Lee, Carol|2024-08-02 08:00:00"),
+    ]
+    assert len(problems) == 1 and problems[0].startswith("Exception found for Kim, Jina")
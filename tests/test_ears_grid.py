@@ -0,0 +1,54 @@
+"""Tests of the attendance grid of an EARS month sheet (row 13 is the AM row of the first trainee, column 9 day 1)"""
+
+from pkg_sync.ears_grid import DAYS, AttendanceGrid
+
+
+def sheet_values(*rows):
+    """Given lists of the first values of data region rows, return them padded to a full month"""
+    return [list(row) + [None] * (DAYS - len(row)) for row in rows]
+
+
+def test_set_run_conflicts():
+    grid = AttendanceGrid()
+    assert grid.set_run(13, 9, 11, "P", "block") == []
+    assert grid.set_run(13, 10, 12, "PTO", "assign") == [(10, "PTO", "assign", "P", "block"),
+                                                         (11, "PTO", "assign", "P", "block")]
+    assert grid.set_run(13, 12, 12, "P", "clinic") == [(12, "PTO", "assign", "P", "clinic")]  # PTO is kept
+    assert grid.set_run(13, 9, 9, "P", "clinic") == []  # same value
+    assert [grid.code_values[code] for code in grid.as_sheet_rows()[0, :4]] == ["P", "PTO", "PTO", "PTO"]
+
+
+def test_set_run_precedence():
+    grid = AttendanceGrid(("P", "PTO"))
+    grid.set_run(14, 9, 9, "PTO", "assign")
+    assert grid.set_run(14, 9, 9, "P", "block") == [(9, "P", "block", "PTO", "assign")]
+
+
+def test_changes():
+    grid = AttendanceGrid()
+    grid.set_run(13, 9, 10, "P")
+    grid.set_run(14, 9, 9, "PTO")
+    grid.set_run(13, 12, 13, None)
+    current = sheet_values(["P", None, None, "VAC", "PTO"], [])
+    # the P already on the sheet and the other code under a clear are left alone
+    assert grid.changes(current) == {(13, 10): "P", (14, 9): "PTO", (13, 13): None}
+    assert grid.unflushed() == 5
+
+    grid.set_flushed()
+    assert grid.changes(current) == {}
+    grid.set_run(13, 9, 9, "PTO")
+    assert grid.unflushed() == 1
+    assert grid.changes(current) == {(13, 9): "PTO"}
+
+
+def test_diff():
+    grid = AttendanceGrid()
+    grid.set_run(13, 9, 10, "P")
+    grid.set_run(14, 9, 9, "PTO")
+    grid.set_run(13, 12, 13, None)
+    current = sheet_values(["P", "PTO", None, "VAC", "PTO", "P"], [None, None, "VAC"])
+    assert grid.diff(current) == {
+        (13, 10): ("conflicting", "P", "PTO"),
+        (14, 9): ("missing", "PTO", None),
+        (13, 14): ("extra", None, "P"),  # codes the sync doesn't write are never extra
+    }
@@ -0,0 +1,61 @@
+"""Tests of the name -> row indexes of the EARS month sheets and of their cache"""
+
+from pkg_sync.ears_names import FIRST_NAME_ROW, NameIndex
+
+
+class Sheet:
+    def __init__(self, name, names):
+        self.name = name
+        self.names = names
+        self.reads = 0
+
+    def read(self, top, left, bottom, right):
+        self.reads += 1
+        column = [[None] for _ in range(bottom - top + 1)]
+        for i, name in enumerate(self.names):
+            column[2 * i][0] = name
+        return column
+
+
+class Workbook:
+    def __init__(self, path, unsaved=False):
+        self.path = str(path)
+        self.unsaved = unsaved
+
+    def unsaved_changes(self):
+        return self.unsaved
+
+
+def test_name_rows_are_cached(tmp_path):
+    path = tmp_path / "EARS.xlsm"
+    path.write_bytes(b"")
+    sheets = [Sheet("EAR_Jul_24", ["Smith, Anna", "Jones, Bob"]), Sheet("EAR_Aug_24", ["Jones, Bob"])]
+    index = NameIndex(Workbook(path), sheets)
+    assert index.row("EAR_Jul_24", "Jones, Bob") == FIRST_NAME_ROW + 2
+    assert index.row("EAR_Aug_24", "Smith, Anna") is None
+    index = NameIndex(Workbook(path), sheets)
+    assert [sheet.reads for sheet in sheets] == [1, 1]
+    assert index.row("EAR_Aug_24", "Jones, Bob") == FIRST_NAME_ROW
+
+
+def test_unsaved_changes_are_scanned(tmp_path):
+    path = tmp_path / "EARS.xlsm"
+    path.write_bytes(b"")
+    NameIndex(Workbook(path), [Sheet("EAR_Jul_24", ["Smith, Anna", "Jones, Bob"])])
+    inserted = Sheet("EAR_Jul_24", ["Smith, Anna", "Kim, Jina", "Jones, Bob"])  # inserted in Excel, not saved
+    index = NameIndex(Workbook(path, unsaved=True), [inserted])
+    assert inserted.reads == 1
+    assert index.row("EAR_Jul_24", "Jones, Bob") == FIRST_NAME_ROW + 4
+
+
+def test_only_scanned_indexes_survive_a_save(tmp_path):
+    path = tmp_path / "EARS.xlsm"
+    path.write_bytes(b"")
+    july, august = Sheet("EAR_Jul_24", ["Smith, Anna"]), Sheet("EAR_Aug_24", ["Smith, Anna"])
+    NameIndex(Workbook(path), [july])
+    index = NameIndex(Workbook(path), [july, august])  # July from the cache, August scanned
+    path.write_bytes(b"saved")
+    index.workbook_saved()
+    july, august = Sheet("EAR_Jul_24", ["Smith, Anna"]), Sheet("EAR_Aug_24", ["Smith, Anna"])
+    NameIndex(Workbook(path), [july, august])
+    assert (july.reads, august.reads) == (1, 0)
@@ -0,0 +1,96 @@
+"""Tests of the source schedule parsers, run with "python -m pytest" from the repository folder"""
+
+from datetime import date, datetime
+
+import pytest
+
+from pkg_sync.ears_sources import AttendanceFact, parse_mgb_block, parse_mgb_clinic, sheet_academic_year
+from pkg_sync.source_reader import SourceTable
+
+
+def block_facts(rows, sheet_name="AY24"):
+    """Given the rows of an MGB block sheet, return {(trainee, source row): (start, end)} of its facts,
+    checking every block has an AM and a PM fact"""
+    facts = parse_mgb_block(SourceTable(rows, sheet_name))
+    spans = {}
+    for fact in facts:
+        spans.setdefault((fact.trainee, fact.source_row, fact.start, fact.end), set()).add(fact.shift)
+    assert all(shifts == {"AM", "PM"} for shifts in spans.values())
+    assert len(facts) == 2 * len(spans)
+    return {(trainee, source_row): (start, end) for trainee, source_row, start, end in spans}
+
+
+def test_mgb_block_original_bands():
+    # the layout the parser used to walk from the hard-coded cells (3, 2) and (12, 3)
+    rows = [[None] * 4 for _ in range(16)]
+    rows[2][1:4] = ["7/1 - 7/14", "7/15 - 7/28", None]
+    rows[3][1:3] = ["Doe, Jane", "Roe, Rick (DGM)"]
+    rows[4][1] = "Holiday Coverage"
+    rows[11][2:4] = ["1/6 - 1/19", "1/20 - 2/2"]
+    rows[12][2:4] = ["Poe, Paul", "Doe, Jane"]
+    rows[13][3] = "Moe, Mia"
+    assert block_facts(rows) == {
+        ("Doe, Jane", "7/1 - 7/14|Doe, Jane"): (date(2024, 7, 1), date(2024, 7, 14)),
+        ("Roe, Rick", "7/15 - 7/28|Roe, Rick (DGM)"): (date(2024, 7, 15), date(2024, 7, 28)),
+        ("Poe, Paul", "1/6 - 1/19|Poe, Paul"): (date(2025, 1, 6), date(2025, 1, 19)),
+        ("Doe, Jane", "1/20 - 2/2|Doe, Jane"): (date(2025, 1, 20), date(2025, 2, 2)),
+        ("Moe, Mia", "1/20 - 2/2|Moe, Mia"): (date(2025, 1, 20), date(2025, 2, 2)),
+    }
+
+
+def test_mgb_block_headers_anywhere():
+    # a band starting in column A, and a header right under a full column of names
+    rows = [
+        ["9/20 - 10/3", None],
+        ["Doe, Jane", " 10/4-10/17 "],
+        ["10/4 - 10/17", "Roe, Rick"],
+        ["Poe, Paul", None],
+    ]
+    assert block_facts(rows) == {
+        ("Doe, Jane", "9/20 - 10/3|Doe, Jane"): (date(2024, 9, 20), date(2024, 10, 3)),
+        ("Roe, Rick", " 10/4-10/17 |Roe, Rick"): (date(2024, 10, 4), date(2024, 10, 17)),
+        ("Poe, Paul", "10/4 - 10/17|Poe, Paul"): (date(2024, 10, 4), date(2024, 10, 17)),
+    }
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("12/23 - 1/5", date(2024, 12, 23), date(2025, 1, 5)),  # new year
+    ("6/23 - 7/6", date(2025, 6, 23), date(2025, 7, 6)),  # end of the academic year
+    ("6/30 - 6/30", date(2025, 6, 30), date(2025, 6, 30)),
+    ("7/1 - 7/1", date(2024, 7, 1), date(2024, 7, 1)),
+])
+def test_mgb_block_year_crossing_headers(header, start, end):
+    assert block_facts([[header], ["Doe, Jane"]]) == {("Doe, Jane", f"{header}|Doe, Jane"): (start, end)}
+
+
+def test_mgb_block_academic_year():
+    facts = parse_mgb_block(SourceTable([["6/23 - 7/6"], ["Doe, Jane"]], "Other"), academic_year=2030)
+    assert facts[0] == AttendanceFact("Doe, Jane", date(2031, 6, 23), date(2031, 7, 6), "AM", "P",
+                                      "6/23 - 7/6|Doe, Jane")
+    assert sheet_academic_year("IM AY 25") == 2025
+    with pytest.raises(ValueError):
+        sheet_academic_year("Sheet1")
+
+
+def test_mgb_clinic():
+    rows = [
+        ["Name", datetime(2024, 7, 1), datetime(2024, 7, 2), None, datetime(2024, 7, 4), None, None, datetime(2024, 7, 8)],
+        ["Doe, Jane (PGY1)", "VA", None, "VA", "VA", None, None, "VA"],  # AM
+        [None, "  ", "VA", None, None, None, None, None],  # PM
+        ["Roe, Rick", None, None, None, None, None, None, None],
+        [None, None, None, None, "VA", None, None, None],
+        [None, "VA", "VA", None, None, None, None, None],  # a blank name ends the block
+        [None, "VA", "VA", None, None, None, None, None],
+    ]
+    # a column with no date is skipped, two blank dates end the block
+    assert parse_mgb_clinic(SourceTable(rows)) == [
+        AttendanceFact("Doe, Jane", date(2024, 7, 1), date(2024, 7, 1), "AM", "P", "Doe, Jane|2024-07-01|AM"),
+        AttendanceFact("Doe, Jane", date(2024, 7, 4), date(2024, 7, 4), "AM", "P", "Doe, Jane|2024-07-04|AM"),
+        AttendanceFact("Doe, Jane", date(2024, 7, 2), date(2024, 7, 2), "PM", "P", "Doe, Jane|2024-07-02|PM"),
+        AttendanceFact("Roe, Rick", date(2024, 7, 4), date(2024, 7, 4), "PM", "P", "Roe, Rick|2024-07-04|PM"),
+    ]
+
+
+def test_mgb_clinic_empty_sheet():
+    assert parse_mgb_clinic(SourceTable([])) == []
+    assert parse_mgb_clinic(SourceTable([["Name", datetime(2024, 7, 1)]])) == []
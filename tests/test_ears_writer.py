@@ -0,0 +1,24 @@
+"""Tests of the batched EARS writes"""
+
+from pkg_sync.ears_writer import plan_rectangles
+
+
+def test_plan_rectangles():
+    marks = {(13, 9): "P", (13, 10): "P", (14, 9): "PTO", (14, 10): "P",  # AM and PM rows of a trainee
+             (13, 12): "P",  # after an unmarked column
+             (16, 9): "P", (16, 10): None}  # after an unmarked row
+    assert sorted(plan_rectangles(marks)) == [
+        (13, 9, [["P", "P"], ["PTO", "P"]]),
+        (13, 12, [["P"]]),
+        (16, 9, [["P", None]]),
+    ]
+
+
+def test_plan_rectangles_only_cover_marked_cells():
+    marks = {(13, 9): "P", (13, 10): "P", (13, 11): "P", (14, 10): "P"}
+    rectangles = plan_rectangles(marks)
+    covered = {(row + i, col + j): value for row, col, values in rectangles
+               for i, row_values in enumerate(values) for j, value in enumerate(row_values)}
+    assert covered == marks
+    assert len(covered) == sum(len(values) * len(values[0]) for _, _, values in rectangles)  # no overlaps
+    assert plan_rectangles({}) == []
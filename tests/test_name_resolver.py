@@ -0,0 +1,79 @@
+"""Tests of the source name -> EARS name matching"""
+
+import json
+
+from pkg_sync.name_resolver import NameResolver, normalize_name
+
+EARS_NAMES = ["Smith, Anna", "Smith, Anna Marie", "Vergara Greeno, Rebeca", "Kim, Jina", "Lee, Min Seo",
+              "Garcia, Maria", "Nguyen, Dan Van", "Jones, Bob"]
+
+
+def test_normalize_name():
+    assert normalize_name("Vergara-Greeno,  Rebéca (DGM)") == "vergara greeno, rebeca"
+    assert normalize_name("O.Neil , Pat  J.") == "oneil, pat j"
+
+
+def test_exact_and_normalized():
+    resolver = NameResolver(EARS_NAMES)
+    assert resolver.resolve("Smith, Anna (PGY1)") == "Smith, Anna"
+    assert resolver.resolve("Smith, Anna Marie") == "Smith, Anna Marie"
+    assert resolver.resolve("vergara-greeno, rebéca") == "Vergara Greeno, Rebeca"
+    assert resolver.counts() == {"exact": 2, "normalized": 1}
+
+
+def test_middle_names_only_one_side_has():
+    resolver = NameResolver(EARS_NAMES)
+    assert resolver.resolve("Jones, Bob Allen") == "Jones, Bob"  # the EARS name has none
+    assert resolver.resolve("Nguyen, Dan") == "Nguyen, Dan Van"  # the source name has none
+    assert resolver.resolve("Lee, Min Jun") is None  # both have one, and they differ
+    assert NameResolver(["Lee, Min Jun", "Lee, Min Seo"]).resolve("Lee, Min") is None  # either of them
+
+
+def test_look_alike_names_are_only_suggested(tmp_path):
+    alias_path = str(tmp_path / "aliases.json")
+    resolver = NameResolver(EARS_NAMES, alias_path)
+    assert resolver.resolve("Kim, Jin") is None  # same last name, first name starting the EARS one
+    assert resolver.resolve("Garcia, Mario") is None
+    assert resolver.resolve("Smyth, Anna Marie") is None
+    assert [(name, match) for name, match, _ in resolver.suggestions] == [
+        ("Kim, Jin", "Kim, Jina"), ("Garcia, Mario", "Garcia, Maria"), ("Smyth, Anna Marie", "Smith, Anna Marie")]
+    resolver.save()
+    with open(alias_path) as alias_file:
+        aliases = json.load(alias_file)
+    assert aliases["Kim, Jin"]["suggested"] == "Kim, Jina"
+
+    aliases["Kim, Jin"] = "Kim, Jina"  # confirmed
+    aliases["Garcia, Mario"] = None  # not Maria
+    with open(alias_path, "w") as alias_file:
+        json.dump(aliases, alias_file)
+    resolver = NameResolver(EARS_NAMES, alias_path)
+    assert resolver.resolve("Kim, Jin") == "Kim, Jina"
+    assert resolver.resolve("Garcia, Mario") is None
+    assert resolver.resolve("Smyth, Anna Marie") is None  # still waiting
+    assert [name for name, _, _ in resolver.suggestions] == ["Smyth, Anna Marie"]
+
+
+def test_no_suggestions_at_threshold_one():
+    resolver = NameResolver(EARS_NAMES, threshold=1)
+    assert resolver.resolve("Kim, Jin") is None
+    assert resolver.resolve("Garcia, Mario") is None
+    assert resolver.suggestions == []
+
+
+def test_save_keeps_entries_of_the_file(tmp_path):
+    alias_path = str(tmp_path / "aliases.json")
+    resolver = NameResolver(EARS_NAMES, alias_path)
+    resolver.resolve("Kim, Jin")
+    with open(alias_path, "w") as alias_file:  # confirmed while the run went on
+        json.dump({"Kim, Jin": "Kim, Jina", "Other, Name": None}, alias_file)
+    resolver.save()
+    with open(alias_path) as alias_file:
+        assert json.load(alias_file) == {"Kim, Jin": "Kim, Jina", "Other, Name": None}
+
+
+def test_unreadable_alias_file(tmp_path):
+    alias_path = tmp_path / "aliases.json"
+    alias_path.write_text("{not json")
+    resolver = NameResolver(EARS_NAMES, str(alias_path))
+    assert resolver.resolve("Smith, Anna") == "Smith, Anna"
+    assert len(resolver.problems) == 1
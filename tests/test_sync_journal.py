@@ -0,0 +1,49 @@
+"""Tests of the write journal and of what resume finds in it"""
+
+from pkg_sync.sync_journal import WriteJournal, journal_path, unfinished_run
+
+
+def test_unfinished_run(tmp_path):
+    ears_path = str(tmp_path / "EARS AY25 BMC.xlsm")
+    journal = WriteJournal(ears_path)
+    assert unfinished_run(ears_path) is None
+    journal.begin(site="BMC", sources=["block"])
+    journal.planned("EAR_Jul_24", 13, 9, [["P"]])
+    journal.journaled()
+    journal.saved()  # a checkpoint
+    journal.planned("EAR_Aug_24", 13, 9, [["P", "P"]])
+    journal.journaled(last=True)
+    begin, committed, uncommitted, complete = unfinished_run(ears_path)
+    assert begin["site"] == "BMC"
+    assert [record["sheet"] for record in committed] == ["EAR_Jul_24"]
+    assert [record["values"] for record in uncommitted] == [[["P", "P"]]]
+    assert complete
+    journal.done()
+    assert unfinished_run(ears_path) is None
+
+
+def test_unfinished_run_cut_short(tmp_path):
+    ears_path = str(tmp_path / "EARS AY25 BMC.xlsm")
+    journal = WriteJournal(ears_path)
+    journal.begin(site="BMC", sources=["block"])
+    journal.planned("EAR_Jul_24", 13, 9, [["P"]])
+    journal.journaled()
+    journal.planned("EAR_Aug_24", 13, 9, [["P"]])  # the flush died before it was journaled whole
+    journal.sync()
+    with open(journal_path(ears_path), "a") as journal_file:
+        journal_file.write('{"event": "plan')  # and in the middle of a line
+    _, committed, uncommitted, complete = unfinished_run(ears_path)
+    assert committed == []
+    assert [record["sheet"] for record in uncommitted] == ["EAR_Jul_24"]
+    assert not complete
+
+
+def test_journals_of_two_workbooks(tmp_path):
+    ay24, ay25 = str(tmp_path / "EARS AY24.xlsm"), str(tmp_path / "EARS AY25.xlsm")
+    WriteJournal(ay24).begin(site="BMC")
+    journal = WriteJournal(ay25)
+    journal.begin(site="BMC")
+    journal.done()
+    assert journal_path(ay24) != journal_path(ay25)
+    assert unfinished_run(ay24) is not None
+    assert unfinished_run(ay25) is None
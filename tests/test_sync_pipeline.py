@@ -0,0 +1,72 @@
+"""End to end tests of run_sync on small synthetic workbooks (see synthetic_workbooks), needs openpyxl"""
+
+import json
+import os
+from datetime import date
+
+import pytest
+
+pytest.importorskip("openpyxl")
+
+from pkg_sync.name_resolver import ALIAS_FILE_NAME
+from pkg_sync.sync_journal import journal_path
+from pkg_sync.sync_metrics import QUIET, InstrumentedSheet
+from pkg_sync.sync_pipeline import resume_sync, run_sync, verify_sync
+from pkg_sync.synthetic_workbooks import make_bmc_block, make_ears_workbook, trainee_names
+
+
+@pytest.fixture
+def bmc_folder(tmp_path):
+    """A BMC EARS workbook and block export (Jul-Dec 2024) where the export misspells the first trainee"""
+    names = trainee_names(3)
+    ears_path, block_path = str(tmp_path / "EARS AY25 BMC.xlsm"), str(tmp_path / "Block.xlsx")
+    make_ears_workbook(ears_path, ["Zimmerman, Alexandra"] + names, 2024)
+    make_bmc_block(block_path, ["Zimmermann, Alexandra"] + names, date(2024, 7, 1), date(2024, 12, 31))
+    return tmp_path, {"ears_path": ears_path, "source_paths": {"block": block_path}}
+
+
+def sync(paths, **options):
+    return run_sync("BMC", ["block"], backend_name="openpyxl", workers=1, verbosity=QUIET, **paths, **options)
+
+
+def test_confirmed_alias_is_written_by_an_incremental_run(bmc_folder):
+    folder, paths = bmc_folder
+    sync(paths)
+    differences = verify_sync("BMC", ["block"], backend_name="openpyxl", workers=1, verbosity=QUIET, **paths)
+    assert differences == []  # the suggested name is not expected anywhere yet
+
+    alias_path = os.path.join(folder, ALIAS_FILE_NAME)
+    with open(alias_path) as alias_file:
+        aliases = json.load(alias_file)
+    assert aliases["Zimmermann, Alexandra"]["suggested"] == "Zimmerman, Alexandra"
+    with open(alias_path, "w") as alias_file:
+        json.dump({"Zimmermann, Alexandra": "Zimmerman, Alexandra"}, alias_file)
+
+    metrics = sync(paths, incremental=True)
+    assert metrics.counts["block"]["unplaced"] > 0
+    assert metrics.counts["cells_written"] > 0
+    assert sync(paths, incremental=True).counts["cells_written"] == 0  # placed now, nothing left to retry
+    differences = verify_sync("BMC", ["block"], backend_name="openpyxl", workers=1, verbosity=QUIET, **paths)
+    assert differences == []
+
+
+def test_resume_after_a_crash_while_writing(bmc_folder, monkeypatch):
+    _, paths = bmc_folder
+    write = InstrumentedSheet.write
+    written = set()
+
+    def failing_write(sheet, top, left, values):
+        written.add(sheet.name)
+        if len(written) == 3:
+            raise OSError("Excel stopped responding")
+        write(sheet, top, left, values)
+
+    monkeypatch.setattr(InstrumentedSheet, "write", failing_write)
+    with pytest.raises(OSError):
+        sync(paths)
+    monkeypatch.setattr(InstrumentedSheet, "write", write)
+
+    assert verify_sync("BMC", ["block"], backend_name="openpyxl", workers=1, verbosity=QUIET, **paths) != []
+    assert resume_sync("BMC", "openpyxl", paths["ears_path"], QUIET) is True
+    assert not os.path.exists(journal_path(paths["ears_path"]))
+    assert verify_sync("BMC", ["block"], backend_name="openpyxl", workers=1, verbosity=QUIET, **paths) == []
@@ -0,0 +1,60 @@
+"""Tests of the source row fingerprints of incremental syncs"""
+
+from datetime import date
+
+from pkg_sync.ears_sources import AttendanceFact
+from pkg_sync.sync_state import SyncState, state_key
+
+
+def fact(trainee, day, shift="AM", code="P", source_row=None, last_day=None):
+    """Return an AttendanceFact of a day of July 2024, its source row named after the trainee and day by default"""
+    start, end = date(2024, 7, day), date(2024, 7, last_day or day)
+    return AttendanceFact(trainee, start, end, shift, code, source_row or f"{trainee}|{day}")
+
+
+def test_delta(tmp_path):
+    ears_path = str(tmp_path / "EARS.xlsm")
+    block = state_key("block", str(tmp_path / "Block.xlsx"))
+    state = SyncState(ears_path)
+    first = [fact("Doe, Jane", 1), fact("Doe, Jane", 1, "PM"), fact("Roe, Rick", 2), fact("Poe, Paul", 3)]
+    delta = state.delta(block, first)
+    assert (delta.added, delta.changed, delta.removed, delta.unchanged, delta.unplaced) == (3, 0, 0, 0, 0)
+    assert delta.sets == first and delta.clears == []
+    state.set_unplaced(block, ["Poe, Paul|3", "Not, Aname|1"])
+    state.save()
+
+    state = SyncState(ears_path)
+    second = [fact("Doe, Jane", 1, "PM"), fact("Doe, Jane", 1),  # same facts, another order
+              fact("Roe, Rick", 2, code="PTO"),  # changed
+              fact("Poe, Paul", 3)]  # unplaced last time
+    delta = state.delta(block, second)
+    assert (delta.added, delta.changed, delta.removed, delta.unchanged, delta.unplaced) == (0, 1, 0, 1, 1)
+    assert delta.sets == second[2:]
+    assert delta.clears == [fact("Roe, Rick", 2, code=None)]
+
+    delta = state.delta(block, second[:3])  # Poe, Paul removed
+    assert (delta.added, delta.changed, delta.removed, delta.unchanged, delta.unplaced) == (0, 0, 1, 2, 0)
+    assert delta.sets == [] and delta.clears == [fact("Poe, Paul", 3, code=None)]
+    assert state.delta(block, second[:3], incremental=False).sets == second[:3]
+
+
+def test_files_of_a_source_are_kept_apart(tmp_path):
+    state = SyncState(str(tmp_path / "EARS.xlsm"))
+    july, january = state_key("block", "Block Jul-Dec.xlsx"), state_key("block", "Block Jan-Jun.xlsx")
+    state.delta(july, [fact("Doe, Jane", 1)])
+    assert state.delta(january, [fact("Roe, Rick", 2)]).removed == 0
+    assert state.current_facts() == {july: [fact("Doe, Jane", 1)], january: [fact("Roe, Rick", 2)]}
+
+
+def test_overlapping(tmp_path):
+    state = SyncState(str(tmp_path / "EARS.xlsm"))
+    block, assign = state_key("block", "Block.xlsx"), state_key("assign", "Assign.xlsx")
+    state.delta(block, [fact("Doe, Jane", 1, last_day=14), fact("Doe, Jane", 1, "PM", last_day=14)])
+    state.delta(assign, [fact("Doe, Jane", 10, code="PTO"), fact("Roe, Rick", 10, code="PTO")])
+
+    clears = [fact("Doe, Jane", 10, code=None, source_row="Doe, Jane|10")]
+    assert state.overlapping(clears) == {block: [fact("Doe, Jane", 1, last_day=14)],
+                                         assign: [fact("Doe, Jane", 10, code="PTO")]}
+    assert state.overlapping(clears, skip=[block]) == {assign: [fact("Doe, Jane", 10, code="PTO")]}
+    assert state.overlapping([fact("Doe, Jane", 15), fact("Roe, Rick", 10, "PM")]) == {}
+    assert state.overlapping([]) == {}